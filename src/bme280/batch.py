@@ -0,0 +1,118 @@
+# NumPyによる一括補正
+#
+# キャプチャ済みのADC値 (Bme280.read_raw_many() の結果など) を配列のまままとめて補正する。
+# データシートの「4.2.3 Compensation formulas」の32bit/64bit整数の補正式を int64 のベクトル演算で再現しているので、
+# 結果は compensate_* 関数 (1サンプルずつの補正) と一致する。
+#   - 除算は compensate_pressure と同じく切り捨て (floor) で計算する
+#   - 気圧の var1 == 0 の場合は 0 を返す
+#   - 湿度は 0 ~ 419430400 にクランプする
+from collections import OrderedDict
+from typing import List, NamedTuple
+import numpy as np
+from bme280.bme280 import RawSample
+
+
+class BatchResult(NamedTuple):
+    """一括補正の結果 (各要素は同じ長さの配列)"""
+    temp: np.ndarray      # DegC (float64)
+    pressure: np.ndarray  # hPa (float64)
+    humidity: np.ndarray  # %RH (float64)
+    t_fine: np.ndarray    # int64
+
+
+def raw_samples_to_arrays(samples: List[RawSample]):
+    """RawSample のリストを (temp_raw, pressure_raw, humidity_raw) の int64 配列に変換する"""
+    raw = np.array(samples, dtype=np.int64).reshape(-1, 3)
+    return raw[:, 1], raw[:, 0], raw[:, 2]
+
+
+def compensate_temp_batch(temp_raw, cal_data: OrderedDict):
+    """温度を一括補正する。戻り値は (t_fine, DegC)"""
+    adc_t = np.asarray(temp_raw, dtype=np.int64)
+    t1 = np.int64(cal_data["dig_T1"])
+    t2 = np.int64(cal_data["dig_T2"])
+    t3 = np.int64(cal_data["dig_T3"])
+
+    var1 = (((adc_t >> 3) - (t1 << 1)) * t2) >> 11
+    d = (adc_t >> 4) - t1
+    var2 = (((d * d) >> 12) * t3) >> 14
+    t_fine = var1 + var2
+    temp = ((t_fine * 5 + 128) >> 8) / 100
+    return t_fine, temp
+
+
+def compensate_pressure_batch(pressure_raw, cal_data: OrderedDict, t_fine) -> np.ndarray:
+    """気圧を一括補正する (hPa)"""
+    adc_p = np.asarray(pressure_raw, dtype=np.int64)
+    t_fine = np.asarray(t_fine, dtype=np.int64)
+    p1 = np.int64(cal_data["dig_P1"])
+    p2 = np.int64(cal_data["dig_P2"])
+    p3 = np.int64(cal_data["dig_P3"])
+    p4 = np.int64(cal_data["dig_P4"])
+    p5 = np.int64(cal_data["dig_P5"])
+    p6 = np.int64(cal_data["dig_P6"])
+    p7 = np.int64(cal_data["dig_P7"])
+    p8 = np.int64(cal_data["dig_P8"])
+    p9 = np.int64(cal_data["dig_P9"])
+
+    var1 = t_fine - 128000
+    var2 = var1 * var1 * p6
+    var2 = var2 + ((var1 * p5) << 17)
+    var2 = var2 + (p4 << 35)
+    var1 = ((var1 * var1 * p3) >> 8) + ((var1 * p2) << 12)
+    var1 = (((np.int64(1) << 47) + var1) * p1) >> 33
+
+    # var1 == 0 の要素はゼロ除算を避けて 0 を返す
+    zero = var1 == 0
+    divisor = np.where(zero, 1, var1)
+    p = 1048576 - adc_p
+    p = (((p << 31) - var2) * 3125) // divisor
+    var1 = (p9 * (p >> 13) * (p >> 13)) >> 25
+    var2 = (p8 * p) >> 19
+    p = ((p + var1 + var2) >> 8) + (p7 << 4)
+    return np.where(zero, 0.0, p / 256 / 100)
+
+
+def compensate_humidity_batch(humidity_raw, cal_data: OrderedDict, t_fine) -> np.ndarray:
+    """湿度を一括補正する (%RH)"""
+    adc_h = np.asarray(humidity_raw, dtype=np.int64)
+    t_fine = np.asarray(t_fine, dtype=np.int64)
+    h1 = np.int64(cal_data["dig_H1"])
+    h2 = np.int64(cal_data["dig_H2"])
+    h3 = np.int64(cal_data["dig_H3"])
+    h4 = np.int64(cal_data["dig_H4"])
+    h5 = np.int64(cal_data["dig_H5"])
+    h6 = np.int64(cal_data["dig_H6"])
+
+    x = t_fine - 76800
+    v = (
+        (
+            (((adc_h << 14) - (h4 << 20) - (h5 * x)) + 16384) >> 15
+        ) * (
+            ((((((x * h6) >> 10) * (((x * h3) >> 11) + 32768)) >> 10) + 2097152) * h2 + 8192) >> 14
+        )
+    )
+    v = v - (((((v >> 15) * (v >> 15)) >> 7) * h1) >> 4)
+    v = np.clip(v, 0, 419430400)
+    return (v >> 12) / 1024
+
+
+def compensate_batch(temp_raw, pressure_raw, humidity_raw, cal_data: OrderedDict) -> BatchResult:
+    """
+    温度・気圧・湿度のADC値の配列を一括補正する
+
+    temp_raw, pressure_raw, humidity_raw は同じ長さの整数配列 (リストでも可)
+    """
+    t_fine, temp = compensate_temp_batch(temp_raw, cal_data)
+    return BatchResult(
+        temp=temp,
+        pressure=compensate_pressure_batch(pressure_raw, cal_data, t_fine),
+        humidity=compensate_humidity_batch(humidity_raw, cal_data, t_fine),
+        t_fine=t_fine,
+    )
+
+
+def compensate_samples(samples: List[RawSample], cal_data: OrderedDict) -> BatchResult:
+    """Bme280.read_raw_many() の結果を一括補正する"""
+    temp_raw, pressure_raw, humidity_raw = raw_samples_to_arrays(samples)
+    return compensate_batch(temp_raw, pressure_raw, humidity_raw, cal_data)
@@ -0,0 +1,169 @@
+# 補正計算のマイクロベンチマーク (これまでの compensate_* と Compensator、一括補正の compensate_batch)
+#
+# 実行方法 (srcディレクトリで実行)
+#   python -m bme280.benchmark
+#
+# センサーが無くても実行できるように、データシート (BMP280 データシート「3.12 Calculating pressure and temperature」)
+# の計算例で使われているキャリブレーションデータを利用する。
+import random
+import time
+from collections import OrderedDict
+from typing import Callable, List
+from bme280.bme280 import (
+    RawSample,
+    Sample,
+    compensate_temp,
+    compensate_pressure,
+    compensate_humidity,
+)
+from bme280.compensation import Compensator
+from bme280.batch import compensate_batch, raw_samples_to_arrays
+
+
+# データシートの計算例のキャリブレーションデータ
+# (湿度の係数はデータシートに例がないので、実機でよく見られる値を利用)
+DATASHEET_CAL_DATA = OrderedDict([
+    ("dig_T1", 27504),
+    ("dig_T2", 26435),
+    ("dig_T3", -1000),
+    ("dig_P1", 36477),
+    ("dig_P2", -10685),
+    ("dig_P3", 3024),
+    ("dig_P4", 2855),
+    ("dig_P5", 140),
+    ("dig_P6", -7),
+    ("dig_P7", 15500),
+    ("dig_P8", -14600),
+    ("dig_P9", 6000),
+    ("dig_H1", 75),
+    ("dig_H2", 362),
+    ("dig_H3", 0),
+    ("dig_H4", 324),
+    ("dig_H5", 50),
+    ("dig_H6", 30),
+])
+
+# データシートの計算例 (ADC値, 温度[DegC], t_fine, 気圧[Pa])
+# データシートに載っている桁 (気圧は1Pa) で比較する。湿度はデータシートに例がないので確認しない
+GOLDEN_VECTORS = [
+    (RawSample(pressure_raw=415148, temp_raw=519888, humidity_raw=30000), 25.08, 128422, 100653),
+]
+
+# 回帰確認用のスナップショット (現在の compensate_* で計算した値)
+# 正しさの根拠ではなく、補正式を書き換えたときに結果が変わっていないことの確認に使う
+REGRESSION_SNAPSHOTS = [
+    (RawSample(pressure_raw=415148, temp_raw=519888, humidity_raw=30000),
+     Sample(temp=25.08, pressure=1006.5325390625, humidity=51.080078125, t_fine=128422)),
+    (RawSample(pressure_raw=380000, temp_raw=505000, humidity_raw=27000),
+     Sample(temp=20.42, pressure=1059.62453125, humidity=34.3876953125, t_fine=104525)),
+    (RawSample(pressure_raw=440000, temp_raw=530000, humidity_raw=33000),
+     Sample(temp=28.25, pressure=968.3218359375, humidity=67.9384765625, t_fine=144637)),
+    (RawSample(pressure_raw=300000, temp_raw=480000, humidity_raw=24000),
+     Sample(temp=12.57, pressure=1182.6739453125, humidity=18.08984375, t_fine=64342)),
+]
+
+
+def reference_compensate(raw: RawSample, cal_data: OrderedDict) -> Sample:
+    """これまでの補正関数 (cal_data を毎回引く) で補正する"""
+    t_fine, temp = compensate_temp(raw.temp_raw, cal_data)
+    return Sample(
+        temp=temp,
+        pressure=compensate_pressure(raw.pressure_raw, cal_data, t_fine),
+        humidity=compensate_humidity(raw.humidity_raw, cal_data, t_fine),
+        t_fine=t_fine,
+    )
+
+
+def make_samples(n: int, seed: int = 0) -> List[RawSample]:
+    """
+    室内で測定したような値をn件作る
+    温度は大きく変わらないので、t_fine のキャッシュが効く状況も再現する
+    """
+    rand = random.Random(seed)
+    temp_raw = 519888
+    samples = []
+    for _ in range(n):
+        temp_raw += rand.choice((-16, 0, 0, 0, 16))
+        samples.append(RawSample(
+            pressure_raw=rand.randint(410000, 420000),
+            temp_raw=temp_raw,
+            humidity_raw=rand.randint(28000, 32000),
+        ))
+    return samples
+
+
+def check_golden(cal_data: OrderedDict):
+    """
+    データシートの計算例、回帰確認用のスナップショットとの一致を確認し、
+    Compensator と一括補正 (NumPy) がこれまでの補正関数とビット単位で一致することを確認する
+    """
+    for raw, temp, t_fine, pressure_pa in GOLDEN_VECTORS:
+        got = reference_compensate(raw, cal_data)
+        if got.temp != temp or got.t_fine != t_fine or round(got.pressure * 100) != pressure_pa:
+            raise Exception(f"GoldenMismatch: raw={raw} expected=({temp}, {t_fine}, {pressure_pa}Pa) got={got}")
+
+    compensator = Compensator(cal_data)
+    for raw, expected in REGRESSION_SNAPSHOTS:
+        ref = reference_compensate(raw, cal_data)
+        got = compensator.compensate(raw)
+        if ref != expected or got != expected:
+            raise Exception(f"RegressionMismatch: raw={raw} expected={expected} reference={ref} compensator={got}")
+
+    # ランダムなADC値 (全範囲) でもビット単位で一致することを確認
+    rand = random.Random(1)
+    for _ in range(10000):
+        raw = RawSample(rand.randrange(1 << 20), rand.randrange(1 << 20), rand.randrange(1 << 16))
+        ref = reference_compensate(raw, cal_data)
+        got = compensator.compensate(raw)
+        if ref != got:
+            raise Exception(f"Mismatch: raw={raw} reference={ref} compensator={got}")
+
+    # 一括補正 (NumPy) も同じ値になることを確認
+    samples = [raw for raw, _ in REGRESSION_SNAPSHOTS] + make_samples(10000, seed=2) + [
+        RawSample(rand.randrange(1 << 20), rand.randrange(1 << 20), rand.randrange(1 << 16)) for _ in range(10000)
+    ]
+    result = compensate_batch(*raw_samples_to_arrays(samples), cal_data)
+    for i, raw in enumerate(samples):
+        ref = reference_compensate(raw, cal_data)
+        got = Sample(float(result.temp[i]), float(result.pressure[i]), float(result.humidity[i]), int(result.t_fine[i]))
+        if ref != got:
+            raise Exception(f"BatchMismatch: raw={raw} reference={ref} batch={got}")
+
+
+def bench(name: str, func: Callable[[RawSample], Sample], samples: List[RawSample], repeat: int = 5) -> float:
+    """n件の補正にかかる時間を計測して samples/sec を表示する (repeat 回のうち最速の値)"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for raw in samples:
+            func(raw)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    rate = len(samples) / best
+    print(f"{name:<28}: {rate:>12,.0f} samples/sec ({best * 1e6 / len(samples):.2f} us/sample)")
+    return rate
+
+
+def main(n: int = 100000):
+    cal_data = DATASHEET_CAL_DATA
+    check_golden(cal_data)
+    print(f"[INFO] golden vectors OK ({len(GOLDEN_VECTORS)} datasheet, {len(REGRESSION_SNAPSHOTS)} regression snapshots)")
+
+    samples = make_samples(n)
+    compensator = Compensator(cal_data)
+    old = bench("compensate_* (OrderedDict)", lambda raw: reference_compensate(raw, cal_data), samples)
+    new = bench("Compensator", compensator.compensate, samples)
+    print(f"speedup: x{new / old:.2f}")
+
+    # 一括補正は配列への変換を除いた補正計算のみを計測する
+    arrays = raw_samples_to_arrays(samples)
+    start = time.perf_counter()
+    compensate_batch(*arrays, cal_data)
+    elapsed = time.perf_counter() - start
+    batch = n / elapsed
+    print(f"{'compensate_batch (NumPy)':<28}: {batch:>12,.0f} samples/sec ({elapsed * 1e6 / n:.2f} us/sample)")
+    print(f"speedup: x{batch / old:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,24 @@
 # データシート
 #   - https://akizukidenshi.com/download/ds/bosch/BST-BME280_DS001-10.pdf
+#
+# 実行方法 (srcディレクトリで実行)
+#   python -m bme280.bme280
 import time
-from typing import Union, List, Tuple
+from typing import Union, List, Tuple, NamedTuple
 import pigpio
 from pprint import pprint
 from collections import OrderedDict
 import enum
+from bme280.presets import (
+    Mode,
+    Preset,
+    PRESETS,
+    CTRL_HUM_REG,
+    STATUS_REG,
+    CTRL_MEAS_REG,
+    CONFIG_REG,
+    STATUS_MEASURING,
+)
 
 
 def int_to_binary(n: int, bits: int = 8) -> str:
@@ -40,18 +53,44 @@ def read_register(pi, spi_handler, register_addr: int, num_bytes: int) -> bytes:
     return read_data[1:]
 
 
-def read_calibration_data(pi, spi_handler):
+def i2c_write_register(pi, i2c_handler, register_addr: int, data: int):
+    """
+    レジスターに設定を書き込む (I2C)
+    """
+    # I2Cの書き込みはレジスタアドレスをそのまま送る
+    pi.i2c_write_byte_data(i2c_handler, register_addr, data)
+
+
+def i2c_read_register(pi, i2c_handler, register_addr: int, num_bytes: int) -> bytes:
+    """
+    レジスターから指定したバイト数読み取る (I2C)
+    レジスタアドレスの書き込みと読み込みをリピートスタートで1回のトランザクションにまとめる (最大32バイト)
+    """
+    cnt, read_data = pi.i2c_read_i2c_block_data(i2c_handler, register_addr, num_bytes)
+    if cnt != num_bytes:
+        raise Exception(f"ReadError: cnt={cnt} (expected={num_bytes})")
+    return bytes(read_data)
+
+
+def read_calibration_data(pi, handler, read_register=read_register):
     """
     キャリブレーション用のデータを取得する
     データシートの「4.2.2 Trimming parameter readout」を参照
+
+    0x88 ~ 0xA1 (0xA0は未使用) と 0xE1 ~ 0xE7 をそれぞれ1回の転送で読み取る
+    I2Cの場合は read_register に i2c_read_register を渡す
     """
-    cal_1 = read_register(pi, spi_handler, 0x88, 24)
-    cal_2 = read_register(pi, spi_handler, 0xA1, 1)
-    cal_3 = read_register(pi, spi_handler, 0xE1, 7)
-    #print(f"0x88 ~ 0x9F: {bytes_to_binary(cal_1)}")
-    #print(f"0xA1: {bytes_to_binary(cal_2)}")
+    cal_12 = read_register(pi, handler, 0x88, 26)
+    cal_3 = read_register(pi, handler, 0xE1, 7)
+    #print(f"0x88 ~ 0xA1: {bytes_to_binary(cal_12)}")
     #print(f"0xE1 ~ 0xE7: {bytes_to_binary(cal_3)}")
+    return parse_calibration_data(cal_12[0:24], cal_12[25:26], cal_3)
+
 
+def parse_calibration_data(cal_1: bytes, cal_2: bytes, cal_3: bytes) -> OrderedDict:
+    """
+    キャリブレーションデータ (0x88 ~ 0x9F, 0xA1, 0xE1 ~ 0xE7) を係数に変換する
+    """
     cal_data = OrderedDict([
         # --- --- --- 0x88 ~ 0x9F --- --- ---
         ("dig_T1", int.from_bytes(cal_1[0:2]  , byteorder="little", signed=False)),
@@ -73,25 +112,56 @@ def read_calibration_data(pi, spi_handler):
         # --- --- --- 0xE1 ~ 0xE7 --- --- ---
         ("dig_H2", int.from_bytes(cal_3[0:2], byteorder="little", signed=True)),
         ("dig_H3", int.from_bytes(cal_3[2:3], byteorder="little", signed=False)),
-        ("dig_H4", cal_3[3] << 4 | (0b00001111 & cal_3[4])),
-        ("dig_H5", cal_3[5] << 4 | (0b00001111 & (cal_3[4] >> 4))),
-        ("dig_H6", int.from_bytes(cal_3[7:8], byteorder="little", signed=True)),
+        # dig_H4, dig_H5 は12ビットの符号付き整数 (上位バイトの符号をそのまま使う)
+        ("dig_H4", int.from_bytes(cal_3[3:4], byteorder="little", signed=True) * 16 | (0b00001111 & cal_3[4])),
+        ("dig_H5", int.from_bytes(cal_3[5:6], byteorder="little", signed=True) * 16 | (0b00001111 & (cal_3[4] >> 4))),
+        ("dig_H6", int.from_bytes(cal_3[6:7], byteorder="little", signed=True)),
     ])
     #pprint(cal_data)
     return cal_data
 
 
-def read_temp(pi, spi_handler, cal_data: OrderedDict) -> Tuple[int, float]:
+# データレジスタ (0xF7 ~ 0xFE) の先頭アドレスとバイト数
+#   0xF7 ~ 0xF9: press_msb, press_lsb, press_xlsb
+#   0xFA ~ 0xFC: temp_msb, temp_lsb, temp_xlsb
+#   0xFD ~ 0xFE: hum_msb, hum_lsb
+DATA_REGISTER = 0xF7
+DATA_LENGTH = 8
+
+DEFAULT_INTERVAL = 1.0  # 表示間隔[sec] (ノーマルモードで --interval を省略した場合。以前の time.sleep(1) と同じ)
+
+
+class RawSample(NamedTuple):
+    """補正前のADC値"""
+    pressure_raw: int
+    temp_raw: int
+    humidity_raw: int
+
+
+class Sample(NamedTuple):
+    """補正後の測定値"""
+    temp: float      # DegC
+    pressure: float  # hPa
+    humidity: float  # %RH
+    t_fine: int
+
+
+def parse_raw_sample(data: Union[bytearray, bytes]) -> RawSample:
     """
-    温度を読み取る
+    0xF7 ~ 0xFE の8バイトを気圧・温度・湿度のADC値に分解する
+    気圧・温度は20ビット、湿度は16ビットフォーマット
     """
-    temp_register = 0xFA
-    read_bytes = read_register(pi, spi_handler, temp_register, 3)
-    # 温度は20ビットフォーマットで受信され、正値で32ビット符号付き整数
-    temp_raw = int.from_bytes(read_bytes, byteorder="big") >> 4
-    #print(f"temp: bytes={bytes_to_binary(read_bytes)}, temp_raw={temp_raw}")
+    return RawSample(
+        pressure_raw=(data[0] << 12) | (data[1] << 4) | (data[2] >> 4),
+        temp_raw=(data[3] << 12) | (data[4] << 4) | (data[5] >> 4),
+        humidity_raw=(data[6] << 8) | data[7],
+    )
+
 
-    # 以下キャリブレーション (データシートの「4.2.3 Compensation formulas」を参照)
+def compensate_temp(temp_raw: int, cal_data: OrderedDict) -> Tuple[int, float]:
+    """
+    温度のADC値を補正する (データシートの「4.2.3 Compensation formulas」を参照)
+    """
     var1 = (((temp_raw >> 3) - (cal_data["dig_T1"] << 1)) * cal_data["dig_T2"]) >> 11
     var2 = (((((temp_raw >> 4) - cal_data["dig_T1"]) * ((temp_raw >> 4) - cal_data["dig_T1"])) >> 12) * (cal_data["dig_T3"])) >> 14
     t_fine = var1 + var2
@@ -99,13 +169,10 @@ def read_temp(pi, spi_handler, cal_data: OrderedDict) -> Tuple[int, float]:
     return (t_fine, temp)
 
 
-def read_pressure(pi, spi_handler, cal_data: OrderedDict, t_fine: int) -> float:
-    read_bytes = read_register(pi, spi_handler, 0xF7, 3)
-    # 気圧は20ビットフォーマットで受信され、正値で32ビット符号付き整数
-    pressure_raw = int.from_bytes(read_bytes, byteorder="big") >> 4
-    #print(f"pressure: bytes={bytes_to_binary(read_bytes)}, pressure_raw={pressure_raw}")
-
-    # 以下キャリブレーション (データシートの「4.2.3 Compensation formulas」を参照)
+def compensate_pressure(pressure_raw: int, cal_data: OrderedDict, t_fine: int) -> float:
+    """
+    気圧のADC値を補正する (データシートの「4.2.3 Compensation formulas」を参照)
+    """
     var1 = t_fine - 128000
     var2 = var1 * var1 * cal_data["dig_P6"]
     var2 = var2 + ((var1 * cal_data["dig_P5"]) << 17)
@@ -122,13 +189,10 @@ def read_pressure(pi, spi_handler, cal_data: OrderedDict, t_fine: int) -> float:
     return p / 256 / 100  # hPa
 
 
-def read_humidity(pi, spi_handler, cal_data: OrderedDict, t_fine: int) -> float:
-    read_bytes = read_register(pi, spi_handler, 0xFD, 2)
-    # 湿度は16ビットフォーマットで受信され、32ビット符号付き整数で保存
-    humidity_raw = int.from_bytes(read_bytes, byteorder="big")
-    #print(f"pressure: bytes={bytes_to_binary(read_bytes)}, humidity_raw={humidity_raw}")
-
-    # 以下キャリブレーション (データシートの「4.2.3 Compensation formulas」を参照)
+def compensate_humidity(humidity_raw: int, cal_data: OrderedDict, t_fine: int) -> float:
+    """
+    湿度のADC値を補正する (データシートの「4.2.3 Compensation formulas」を参照)
+    """
     v_x1_u32r = t_fine - 76800
     v_x1_u32r = (
         (
@@ -143,49 +207,260 @@ def read_humidity(pi, spi_handler, cal_data: OrderedDict, t_fine: int) -> float:
     return (v_x1_u32r >> 12) / 1024  # %RH
 
 
-def main(pi, spi_handler):
-    # 動作設定
-    config_reg = 0x5F
-    t_sb = 0b000    # 測定待機時間 0.5ms
-    filter = 0b101  # IIRフィルター係数 16
-    spi3w_en = 0b0  # 4線式SPI
-    reg_data    = (t_sb << 5) | (filter << 2) | spi3w_en
-    write_register(pi, spi_handler, config_reg, reg_data)
-
-    # 温度・気圧測定の設定
-    ctrl_meas_reg = 0xF4
-    osrs_t = 0b010  # 温度 オーバーサンプリングx2
-    osrs_p = 0b101  # 気圧 オーバーサンプリングx16
-    mode = 0b11     # ノーマルモード
-    reg_data = (osrs_t << 5) | (osrs_p << 2) | mode
-    write_register(pi, spi_handler, ctrl_meas_reg, reg_data)
-
-    # 湿度測定の設定
-    ctrl_hum_reg = 0xF2
-    osrs_h = 0b001  # 湿度 オーバーサンプリングx1
-    reg_data  = osrs_h
-    write_register(pi, spi_handler, ctrl_hum_reg, reg_data)
-
-    # キャリブレーションデータ
-    cal_data = read_calibration_data(pi, spi_handler)
+def read_temp(pi, spi_handler, cal_data: OrderedDict) -> Tuple[int, float]:
+    """
+    温度を読み取る
+    ※ 1回の測定でまとめて読み取る場合は Bme280.read() を利用する
+    """
+    temp_register = 0xFA
+    read_bytes = read_register(pi, spi_handler, temp_register, 3)
+    # 温度は20ビットフォーマットで受信され、正値で32ビット符号付き整数
+    temp_raw = int.from_bytes(read_bytes, byteorder="big") >> 4
+    #print(f"temp: bytes={bytes_to_binary(read_bytes)}, temp_raw={temp_raw}")
+    return compensate_temp(temp_raw, cal_data)
+
+
+def read_pressure(pi, spi_handler, cal_data: OrderedDict, t_fine: int) -> float:
+    read_bytes = read_register(pi, spi_handler, 0xF7, 3)
+    # 気圧は20ビットフォーマットで受信され、正値で32ビット符号付き整数
+    pressure_raw = int.from_bytes(read_bytes, byteorder="big") >> 4
+    #print(f"pressure: bytes={bytes_to_binary(read_bytes)}, pressure_raw={pressure_raw}")
+    return compensate_pressure(pressure_raw, cal_data, t_fine)
 
-    while True:
-        t_fine, temp = read_temp(pi, spi_handler, cal_data)
-        print(f"温度: {temp} DegC")
-        press = read_pressure(pi, spi_handler, cal_data, t_fine)
-        print(f"気圧: {press} hPa")
-        hum = read_humidity(pi, spi_handler, cal_data, t_fine)
-        print(f"湿度: {hum} %RH")
-        print()
-        time.sleep(1)
+
+def read_humidity(pi, spi_handler, cal_data: OrderedDict, t_fine: int) -> float:
+    read_bytes = read_register(pi, spi_handler, 0xFD, 2)
+    # 湿度は16ビットフォーマットで受信され、32ビット符号付き整数で保存
+    humidity_raw = int.from_bytes(read_bytes, byteorder="big")
+    #print(f"pressure: bytes={bytes_to_binary(read_bytes)}, humidity_raw={humidity_raw}")
+    return compensate_humidity(humidity_raw, cal_data, t_fine)
 
 
+class SpiTransport:
+    """
+    SPIでレジスタを読み書きする
+    """
 
-if __name__ == "__main__":
-    pi = pigpio.pi()
-    if not pi.connected:
-        raise Exception("pigpio connection faild...")
+    def __init__(self, pi, spi_handler, name: str = None):
+        self.pi = pi
+        self.handler = spi_handler
+        # 接続先 (spi:0 など)
+        self.name = f"spi:{spi_handler}" if name is None else name
+        # 読み込み時の送信データは (アドレス, バイト数) ごとに毎回同じなので作ったものを使い回す
+        self._read_commands = {}
+
+    def read(self, register_addr: int, num_bytes: int) -> bytes:
+        command = self._read_commands.get((register_addr, num_bytes))
+        if command is None:
+            # 読込み時のregister指定は最上位ビットを1にする
+            command = bytes([register_addr | 0b10000000]) + bytes(num_bytes)
+            self._read_commands[(register_addr, num_bytes)] = command
+        cnt, read_data = self.pi.spi_xfer(self.handler, command)
+        if cnt != (num_bytes + 1):
+            raise Exception(f"ReadError: cnt={cnt} (expected={num_bytes+1})")
+        return read_data[1:]
+
+    def write(self, register_addr: int, data: int):
+        write_register(self.pi, self.handler, register_addr, data)
+
+    def close(self):
+        self.pi.spi_close(self.handler)
+
+
+class I2cTransport:
+    """
+    I2Cでレジスタを読み書きする
+    SDOをGNDに接続した場合はアドレス0x76、VDDIOに接続した場合は0x77
+    """
 
+    def __init__(self, pi, i2c_handler, name: str = None):
+        self.pi = pi
+        self.handler = i2c_handler
+        # 接続先 (i2c:0x76 など)
+        self.name = f"i2c:{i2c_handler}" if name is None else name
+
+    def read(self, register_addr: int, num_bytes: int) -> bytes:
+        return i2c_read_register(self.pi, self.handler, register_addr, num_bytes)
+
+    def write(self, register_addr: int, data: int):
+        i2c_write_register(self.pi, self.handler, register_addr, data)
+
+    def close(self):
+        self.pi.i2c_close(self.handler)
+
+
+class Bme280:
+    """
+    BME280を操作するクラス (SPI/I2Cどちらでも利用できる)
+
+    気圧・温度・湿度のデータレジスタ (0xF7 ~ 0xFE) を1回の転送 (SPIならコマンド1バイト + データ8バイト) で読み取る。
+    データシートの「4. Data readout」にある通り、バースト読み込み中はデータレジスタの更新が止まるので
+    3つの値は必ず同じ測定サイクルのものになる。
+    """
+
+    def __init__(self, transport, cal_data: OrderedDict = None):
+        self.transport = transport
+        self.cal_data = None
+        self.compensator = None
+        self.preset = None
+        self._last_ready = None
+        if cal_data is not None:
+            self.set_calibration(cal_data)
+
+    def set_calibration(self, cal_data: OrderedDict):
+        """キャリブレーションデータを設定し、補正用の定数を事前計算する"""
+        from bme280.compensation import Compensator
+        self.cal_data = cal_data
+        self.compensator = Compensator(cal_data)
+
+    def read_calibration(self) -> OrderedDict:
+        """キャリブレーションデータを読み取って保持する"""
+        cal_12 = self.transport.read(0x88, 26)  # 0x88 ~ 0xA1 (0xA0は未使用)
+        cal_3 = self.transport.read(0xE1, 7)
+        self.set_calibration(parse_calibration_data(cal_12[0:24], cal_12[25:26], cal_3))
+        return self.cal_data
+
+    def read_raw(self) -> RawSample:
+        """補正前のADC値を1回のバースト読み込みで取得する"""
+        return parse_raw_sample(self.transport.read(DATA_REGISTER, DATA_LENGTH))
+
+    def read_raw_many(self, n: int) -> List[RawSample]:
+        """
+        補正前のADC値をn回連続で取得する (高レートでのキャプチャ用)
+        補正計算はキャプチャ後にまとめて行う
+        """
+        read = self.transport.read
+        buf = [read(DATA_REGISTER, DATA_LENGTH) for _ in range(n)]
+        return [parse_raw_sample(data) for data in buf]
+
+    def compensate(self, raw: RawSample) -> Sample:
+        """ADC値を補正して測定値に変換する"""
+        if self.compensator is None:
+            self.read_calibration()
+        return self.compensator.compensate(raw)
+
+    def read(self) -> Sample:
+        """気圧・温度・湿度を1回のバースト読み込みで取得して補正する"""
+        return self.compensate(self.read_raw())
+
+    def configure(self, preset: Preset, write: bool = True):
+        """
+        プリセットの設定をレジスタに書き込む
+        write=False の場合はレジスタが設定済み (プロファイルで確認済み) とみなして書き込まない
+
+        - configレジスタはノーマルモード中の書き込みが無視されることがあるので、一度スリープモードにしてから書き込む
+        - ctrl_humレジスタの変更はctrl_measレジスタへの書き込み後に反映されるので、ctrl_measより先に書き込む
+        """
+        if write:
+            self.transport.write(CTRL_MEAS_REG, preset.ctrl_meas(Mode.SLEEP))
+            self.transport.write(CONFIG_REG, preset.config())
+            self.transport.write(CTRL_HUM_REG, preset.ctrl_hum())
+            # フォースドモードは measure() で測定を開始するのでスリープモードのままにしておく
+            self.transport.write(CTRL_MEAS_REG, preset.ctrl_meas(preset.idle_mode()))
+        self.preset = preset
+        self._last_ready = None
+
+    def read_status(self) -> int:
+        """statusレジスタ (0xF3) を読み取る"""
+        return self.transport.read(STATUS_REG, 1)[0]
+
+    def is_measuring(self) -> bool:
+        return bool(self.read_status() & STATUS_MEASURING)
+
+    def wait_ready(self, poll_interval: float = 0.0005):
+        """
+        statusレジスタの measuring ビットを監視して、新しいデータがデータレジスタに転送されるまで待つ
+
+        - フォースドモード: 測定時間(typ)だけ待ってから measuring=0 になるまでポーリングする
+        - ノーマルモード: measuring が 1 -> 0 に変わるまでポーリングする
+          前回データが揃ってから t_standby の間は変換が始まらないので、その間はポーリングしない
+        """
+        preset = self.preset
+        timeout = (preset.measure_time_max() + preset.t_standby) * 2 / 1000
+        if preset.mode == Mode.FORCED:
+            time.sleep(preset.measure_time_typ() / 1000)
+            deadline = time.monotonic() + timeout
+            while self.is_measuring():
+                if time.monotonic() > deadline:
+                    raise Exception(f"TimeoutError: measuring bit did not clear in {timeout}s")
+                time.sleep(poll_interval)
+        else:
+            if self._last_ready is not None:
+                wait = self._last_ready + preset.t_standby / 1000 - time.monotonic()
+                if wait > 0:
+                    time.sleep(wait)
+            deadline = time.monotonic() + timeout
+            measured = False
+            while True:
+                if self.is_measuring():
+                    measured = True
+                elif measured:
+                    break
+                if time.monotonic() > deadline:
+                    raise Exception(f"TimeoutError: no new data in {timeout}s")
+                time.sleep(poll_interval)
+        self._last_ready = time.monotonic()
+
+    def measure(self) -> Sample:
+        """
+        新しい測定結果を待って読み取る
+        フォースドモードの場合は1回測定を行う
+        """
+        if self.preset.mode == Mode.FORCED:
+            self.trigger()
+        self.wait_ready()
+        return self.read()
+
+    def trigger(self):
+        """フォースドモードで1回測定を開始する (測定が終わるとスリープモードに戻る)"""
+        self.transport.write(CTRL_MEAS_REG, self.preset.ctrl_meas(Mode.FORCED))
+
+
+def main(pi, spi_handler, preset: Preset = PRESETS["indoor-navigation"], interval: float = None,
+         chip_select: int = 0, profile_path: str = None):
+    """
+    preset: 動作モードのプリセット
+    interval: 表示間隔[sec] (Noneならプリセットの測定間隔。プリセットに測定間隔がない (ノーマルモード) 場合は DEFAULT_INTERVAL。
+              0ならデータが揃い次第表示する)
+    profile_path: プロファイルの保存先 (Noneなら毎回レジスタの書き込みとキャリブレーションデータの読み込みを行う)
+    """
+    if interval is None:
+        # ノーマルモードのプリセットの interval は 0 (データが揃い次第) なので、そのままだと数十msごとに表示してしまう
+        interval = preset.interval or DEFAULT_INTERVAL
+    print(f"[INFO] preset={preset.name}, mode={preset.mode.name}, "
+          f"measure_time={preset.measure_time_typ():.2f}ms (max {preset.measure_time_max():.2f}ms), "
+          f"odr={preset.odr():.2f}Hz, duty_cycle={preset.duty_cycle() * 100:.2f}%")
+
+    sensor = Bme280(SpiTransport(pi, spi_handler, f"spi:{chip_select}"))
+    if profile_path is None:
+        sensor.configure(preset)
+        # キャリブレーションデータ
+        sensor.read_calibration()
+    else:
+        from bme280.profile import ProfileStore, warm_start
+        warm = warm_start(sensor, preset, ProfileStore(profile_path))
+        print(f"[INFO] {'warm' if warm else 'cold'} start (profile={profile_path})")
+
+    next_time = time.monotonic()
+    while True:
+        sample = sensor.measure()
+        print(f"温度: {sample.temp} DegC")
+        if preset.osrs_p:
+            print(f"気圧: {sample.pressure} hPa")
+        if preset.osrs_h:
+            print(f"湿度: {sample.humidity} %RH")
+        print()
+        # 測定にかかった時間を除いて次の測定まで待つ
+        next_time += interval
+        wait = next_time - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        else:
+            next_time = time.monotonic()
+
+
+def open_spi(pi, spi_channel: int = 0) -> int:
+    """BME280用にSPIをオープンする"""
     # オプション (http://abyz.me.uk/rpi/pigpio/python.html#spi_open)
     # 21 20 19 18 17 16 15 14 13 12 11 10  9  8  7  6  5  4  3  2  1  0
     # b  b  b  b  b  b  R  T  n  n  n  n  W  A u2 u1 u0 p2 p1 p0  m  m
@@ -196,10 +471,26 @@ if __name__ == "__main__":
     spi_mode = 0b11  # SPIモード11を設定。アイドル時のクロックはHIGH(CPOL=1)、クロックがLOWになるときにデータをサンプリング(CPHA=1)
     spi_option = 0b0 | spi_mode
     spi_clock_speed = 1_000_000  # 1MHz
-    spi_channel = 0
-    spi_handler = pi.spi_open(spi_channel, spi_clock_speed, spi_option)
+    return pi.spi_open(spi_channel, spi_clock_speed, spi_option)
+
+
+def open_i2c(pi, i2c_address: int = 0x76, i2c_bus: int = 1) -> int:
+    """BME280用にI2Cをオープンする (i2cdetect 1コマンドでアドレスを確認)"""
+    return pi.i2c_open(i2c_bus, i2c_address)
+
+
+def run(chip_select: int = 0, preset_name: str = "indoor-navigation", interval: float = None, profile_path: str = None):
+    pi = pigpio.pi()
+    if not pi.connected:
+        raise Exception("pigpio connection faild...")
+
+    spi_handler = open_spi(pi, chip_select)
     try:
-        main(pi, spi_handler)
+        main(pi, spi_handler, PRESETS[preset_name], interval, chip_select, profile_path)
     finally:
         pi.spi_close(spi_handler)
-        pi.stop()
\ No newline at end of file
+        pi.stop()
+
+
+if __name__ == "__main__":
+    run(chip_select=0, preset_name="indoor-navigation", interval=1)
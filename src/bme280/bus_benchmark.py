@@ -0,0 +1,79 @@
+# SPI / I2C の1サンプルあたりのレイテンシを比較するベンチマーク (実機が必要)
+#
+# 実行方法
+#   ./bin/cli bme280-bench-bus --device spi:0 --device i2c:0x76 -n 1000
+#
+# 接続先ごとに以下の読み込み方法で n 回読み込み、1サンプルあたりのレイテンシを計測する
+#   - burst       : データレジスタ (0xF7 ~ 0xFE) を1回の転送で読む (Bme280.read_raw)
+#   - per-register: 気圧・温度・湿度を別々に3回の転送で読む (read_temp / read_pressure / read_humidity と同じ)
+#   - byte        : 1バイトずつ8回の転送で読む (I2Cのみ。i2c_read_byte_data)
+import time
+from typing import Callable, List
+import pigpio
+from bme280.bme280 import DATA_REGISTER, DATA_LENGTH
+from bme280.poller import DeviceSpec, parse_device, open_devices, close_devices
+
+
+def percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def bench(name: str, func: Callable[[], None], n: int):
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(n):
+        t = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<24}: {n / elapsed:>9.1f} samples/sec, "
+          f"latency mean={sum(latencies) / n * 1e6:.0f}us "
+          f"p50={percentile(latencies, 50) * 1e6:.0f}us "
+          f"p99={percentile(latencies, 99) * 1e6:.0f}us "
+          f"max={max(latencies) * 1e6:.0f}us")
+
+
+def main(pi, specs: List[DeviceSpec], n: int = 1000):
+    devices = open_devices(pi, specs)
+    try:
+        for device in devices:
+            transport = device.sensor.transport
+            label = device.spec.name
+
+            bench(f"{label} burst", device.sensor.read_raw, n)
+
+            def per_register():
+                transport.read(0xFA, 3)  # 温度
+                transport.read(0xF7, 3)  # 気圧
+                transport.read(0xFD, 2)  # 湿度
+            bench(f"{label} per-register", per_register, n)
+
+            if device.spec.bus == "i2c":
+                handler = transport.handler
+
+                def byte_by_byte():
+                    for addr in range(DATA_REGISTER, DATA_REGISTER + DATA_LENGTH):
+                        pi.i2c_read_byte_data(handler, addr)
+                bench(f"{label} byte", byte_by_byte, n)
+
+            start = time.perf_counter()
+            device.sensor.read_calibration()
+            print(f"{label + ' calibration':<24}: {(time.perf_counter() - start) * 1e6:.0f}us")
+    finally:
+        close_devices(devices)
+
+
+def run(devices: List[str], n: int = 1000):
+    specs = [parse_device(d) for d in devices]
+    pi = pigpio.pi()
+    if not pi.connected:
+        raise Exception("pigpio connection faild...")
+    try:
+        main(pi, specs, n)
+    finally:
+        pi.stop()
+
+
+if __name__ == "__main__":
+    run(["spi:0", "i2c:0x76"])
@@ -0,0 +1,110 @@
+# 補正計算 (データシートの「4.2.3 Compensation formulas」を参照)
+#
+# bme280.py の compensate_* 関数は1サンプルごとに cal_data (OrderedDict) を十数回引き、
+# dig_P4 << 35 や dig_H4 << 20 のような定数式も毎回計算している。
+# Compensator はキャリブレーションデータを読み込んだ時点で定数を畳み込んでおき、
+# 1サンプルあたりの計算を減らす。結果は compensate_* 関数とビット単位で一致する。
+from collections import OrderedDict
+from typing import Tuple
+from bme280.bme280 import RawSample, Sample
+
+
+class Compensator:
+    """
+    キャリブレーションデータから事前計算した定数で補正計算を行うクラス
+    """
+
+    def __init__(self, cal_data: OrderedDict):
+        self.cal_data = cal_data
+
+        # --- --- --- 温度 --- --- ---
+        self._t1 = cal_data["dig_T1"]
+        self._t1_x2 = cal_data["dig_T1"] << 1
+        self._t2 = cal_data["dig_T2"]
+        self._t3 = cal_data["dig_T3"]
+
+        # --- --- --- 気圧 --- --- ---
+        # ((1 << 47) + var1) * dig_P1 = (dig_P1 << 47) + var1 * dig_P1
+        self._p1 = cal_data["dig_P1"]
+        self._p1_s47 = cal_data["dig_P1"] << 47
+        self._p2 = cal_data["dig_P2"]
+        self._p3 = cal_data["dig_P3"]
+        self._p4_s35 = cal_data["dig_P4"] << 35
+        self._p5 = cal_data["dig_P5"]
+        self._p6 = cal_data["dig_P6"]
+        self._p7_s4 = cal_data["dig_P7"] << 4
+        self._p8 = cal_data["dig_P8"]
+        self._p9 = cal_data["dig_P9"]
+
+        # --- --- --- 湿度 --- --- ---
+        # (humidity_raw << 14) - (dig_H4 << 20) - ... + 16384 の定数部分
+        self._h1 = cal_data["dig_H1"]
+        self._h2 = cal_data["dig_H2"]
+        self._h3 = cal_data["dig_H3"]
+        self._h4_offset = 16384 - (cal_data["dig_H4"] << 20)
+        self._h5 = cal_data["dig_H5"]
+        self._h6 = cal_data["dig_H6"]
+
+        # t_fine だけで決まる中間値のキャッシュ
+        # 温度は急には変わらないので、連続したサンプルでは同じ t_fine になることが多い
+        self._p_t_fine = None
+        self._p_var1 = 0
+        self._p_var2 = 0
+        self._h_t_fine = None
+        self._h_x5 = 0
+        self._h_factor = 0
+
+    def temp(self, temp_raw: int) -> Tuple[int, float]:
+        """温度を補正する。戻り値は (t_fine, DegC)"""
+        var1 = (((temp_raw >> 3) - self._t1_x2) * self._t2) >> 11
+        d = (temp_raw >> 4) - self._t1
+        var2 = (((d * d) >> 12) * self._t3) >> 14
+        t_fine = var1 + var2
+        return (t_fine, ((t_fine * 5 + 128) >> 8) / 100)
+
+    def pressure(self, pressure_raw: int, t_fine: int) -> float:
+        """気圧を補正する (hPa)"""
+        if t_fine != self._p_t_fine:
+            var1 = t_fine - 128000
+            sq = var1 * var1
+            var2 = sq * self._p6 + ((var1 * self._p5) << 17) + self._p4_s35
+            var1 = ((sq * self._p3) >> 8) + ((var1 * self._p2) << 12)
+            var1 = (self._p1_s47 + var1 * self._p1) >> 33
+            self._p_t_fine = t_fine
+            self._p_var1 = var1
+            self._p_var2 = var2
+        var1 = self._p_var1
+        if var1 == 0:
+            return 0  # avoid exception caused by division by zero
+        p = ((((1048576 - pressure_raw) << 31) - self._p_var2) * 3125) // var1
+        q = p >> 13
+        p = ((p + ((self._p9 * q * q) >> 25) + ((self._p8 * p) >> 19)) >> 8) + self._p7_s4
+        return p / 256 / 100
+
+    def humidity(self, humidity_raw: int, t_fine: int) -> float:
+        """湿度を補正する (%RH)"""
+        if t_fine != self._h_t_fine:
+            x = t_fine - 76800
+            self._h_t_fine = t_fine
+            self._h_x5 = self._h5 * x
+            self._h_factor = (
+                ((((((x * self._h6) >> 10) * (((x * self._h3) >> 11) + 32768)) >> 10) + 2097152) * self._h2 + 8192) >> 14
+            )
+        v = (((humidity_raw << 14) - self._h_x5 + self._h4_offset) >> 15) * self._h_factor
+        s = v >> 15
+        v = v - ((((s * s) >> 7) * self._h1) >> 4)
+        if v < 0:
+            v = 0
+        elif v > 419430400:
+            v = 419430400
+        return (v >> 12) / 1024
+
+    def compensate(self, raw: RawSample) -> Sample:
+        """ADC値をまとめて補正する"""
+        t_fine, temp = self.temp(raw.temp_raw)
+        return Sample(
+            temp=temp,
+            pressure=self.pressure(raw.pressure_raw, t_fine),
+            humidity=self.humidity(raw.humidity_raw, t_fine),
+            t_fine=t_fine,
+        )
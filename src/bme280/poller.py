@@ -0,0 +1,229 @@
+# 複数のBME280をまとめて測定する
+#
+# SPI (CE0/CE1) と I2C (0x76/0x77) に接続したBME280を1プロセス・1スレッドで扱う。
+# 各センサーの「次にやること (測定開始 / statusの確認)」を時刻順のキューで管理し、
+# あるセンサーが変換している間に他のセンサーの転送を行う。
+# 1台ずつ time.sleep で変換を待つことがないので、スループットはセンサーの台数に比例して伸びる。
+#
+# 実行方法 (srcディレクトリで実行)
+#   ./bin/cli bme280-multi --device spi:0 --device spi:1 --device i2c:0x76 --device i2c:0x77
+import heapq
+import time
+from typing import Callable, List, NamedTuple
+import pigpio
+from bme280.bme280 import Bme280, Sample, SpiTransport, I2cTransport, open_spi, open_i2c
+from bme280.presets import Mode, Preset, PRESETS
+from bme280.profile import ProfileStore, warm_start
+
+
+class DeviceSpec(NamedTuple):
+    """センサーの接続先"""
+    bus: str      # "spi" or "i2c"
+    address: int  # SPI: チップセレクト(0: CE0, 1: CE1), I2C: アドレス(0x76, 0x77)
+
+    @property
+    def name(self) -> str:
+        if self.bus == "spi":
+            return f"spi:{self.address}"
+        return f"i2c:0x{self.address:02x}"
+
+
+def parse_device(text: str) -> DeviceSpec:
+    """ "spi:0", "spi:1", "i2c:0x76", "i2c:0x77" のような文字列を DeviceSpec に変換する"""
+    bus, _, address = text.partition(":")
+    bus = bus.lower()
+    if bus not in ("spi", "i2c") or not address:
+        raise ValueError(f"invalid device: {text} (e.g. spi:0, spi:1, i2c:0x76, i2c:0x77)")
+    return DeviceSpec(bus, int(address, 0))
+
+
+class DeviceStats:
+    """センサーごとの測定レートとレイテンシ"""
+
+    def __init__(self):
+        self.count = 0
+        self.polls = 0  # 変換中でデータを読めなかったstatus確認の回数
+        self.first = None
+        self.last = None
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+
+    def add(self, now: float, latency: float):
+        if self.first is None:
+            self.first = now
+        self.last = now
+        self.count += 1
+        self.latency_sum += latency
+        self.latency_max = max(self.latency_max, latency)
+
+    def rate(self) -> float:
+        """測定レート[Hz]"""
+        if self.count < 2 or self.last == self.first:
+            return 0.0
+        return (self.count - 1) / (self.last - self.first)
+
+    def mean_latency(self) -> float:
+        return self.latency_sum / self.count if self.count else 0.0
+
+    def __str__(self) -> str:
+        return (f"samples={self.count}, rate={self.rate():.2f}Hz, "
+                f"latency(mean)={self.mean_latency() * 1000:.2f}ms, latency(max)={self.latency_max * 1000:.2f}ms, "
+                f"busy_polls={self.polls}")
+
+
+class PolledDevice:
+    def __init__(self, spec: DeviceSpec, sensor: Bme280):
+        self.spec = spec
+        self.sensor = sensor
+        self.stats = DeviceStats()
+        # 測定を開始した時刻 (ノーマルモードはデータが揃う予定の時刻)
+        self.started = 0.0
+
+
+# キューに積む処理
+TRIGGER = 0  # フォースドモードの測定開始
+POLL = 1     # statusを確認し、データが揃っていれば読み取る
+
+
+class Poller:
+    """
+    複数のセンサーを時刻順のキューでスケジューリングして測定する
+
+    - フォースドモード: 測定開始 -> 測定時間(typ)後にstatus確認 -> 読み取り -> interval後に測定開始
+    - ノーマルモード: 測定時間(typ)後にstatus確認 -> 読み取り -> 測定周期後にstatus確認
+    status確認で変換中だった場合は poll_interval 後にもう一度確認する。
+    """
+
+    def __init__(self, devices: List[PolledDevice], preset: Preset, interval: float = None, poll_interval: float = 0.0005):
+        self.devices = devices
+        self.preset = preset
+        self.interval = preset.interval if interval is None else interval
+        self.poll_interval = poll_interval
+
+    def run(self, on_sample: Callable[[PolledDevice, Sample], None], duration: float = None):
+        """
+        測定を行い、データが揃うたびに on_sample(device, sample) を呼び出す
+        duration[sec] を指定した場合はその時間で終了する
+        """
+        preset = self.preset
+        forced = preset.mode == Mode.FORCED
+        measure_time = preset.measure_time_typ() / 1000
+        period = preset.period() / 1000
+
+        queue = []
+        now = time.monotonic()
+        end = None if duration is None else now + duration
+        for i, device in enumerate(self.devices):
+            if forced:
+                device.started = now
+                heapq.heappush(queue, (now, i, TRIGGER))
+            else:
+                # configure() の直後はまだ1回目の測定が終わっていない (リセット値や前のデータが読める) ので、
+                # フォースドモードの測定開始と同じく測定時間(typ)後に最初のstatus確認を行う
+                device.started = now + measure_time
+                heapq.heappush(queue, (device.started, i, POLL))
+
+        while queue:
+            due, i, action = heapq.heappop(queue)
+            if end is not None and due > end:
+                break
+            wait = due - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            device = self.devices[i]
+
+            if action == TRIGGER:
+                device.sensor.trigger()
+                device.started = time.monotonic()
+                heapq.heappush(queue, (device.started + measure_time, i, POLL))
+                continue
+
+            if device.sensor.is_measuring():
+                device.stats.polls += 1
+                heapq.heappush(queue, (time.monotonic() + self.poll_interval, i, POLL))
+                continue
+
+            sample = device.sensor.read()
+            done = time.monotonic()
+            device.stats.add(done, done - device.started)
+            on_sample(device, sample)
+
+            if forced:
+                heapq.heappush(queue, (max(device.started + self.interval, done), i, TRIGGER))
+            else:
+                device.started = done + period
+                heapq.heappush(queue, (device.started, i, POLL))
+
+
+def open_devices(pi, specs: List[DeviceSpec]) -> List[PolledDevice]:
+    """接続先ごとにSPI/I2Cをオープンしてセンサーを作る"""
+    devices = []
+    try:
+        for spec in specs:
+            if spec.bus == "spi":
+                transport = SpiTransport(pi, open_spi(pi, spec.address), spec.name)
+            else:
+                transport = I2cTransport(pi, open_i2c(pi, spec.address), spec.name)
+            devices.append(PolledDevice(spec, Bme280(transport)))
+    except Exception:
+        close_devices(devices)
+        raise
+    return devices
+
+
+def close_devices(devices: List[PolledDevice]):
+    for device in devices:
+        device.sensor.transport.close()
+
+
+def main(pi, specs: List[DeviceSpec], preset: Preset, interval: float = None, duration: float = None, stats_interval: float = 10,
+         profile_path: str = None):
+    devices = open_devices(pi, specs)
+    try:
+        store = None if profile_path is None else ProfileStore(profile_path)
+        for device in devices:
+            if store is None:
+                device.sensor.configure(preset)
+                device.sensor.read_calibration()
+            else:
+                warm = warm_start(device.sensor, preset, store)
+                print(f"[INFO] {device.spec.name}: {'warm' if warm else 'cold'} start")
+        print(f"[INFO] devices={[d.spec.name for d in devices]}, preset={preset.name}, odr={preset.odr():.2f}Hz/device")
+
+        next_stats = time.monotonic() + stats_interval
+
+        def on_sample(device: PolledDevice, sample: Sample):
+            nonlocal next_stats
+            print(f"[{device.spec.name}] temp={sample.temp} DegC, pressure={sample.pressure} hPa, humidity={sample.humidity} %RH")
+            if time.monotonic() >= next_stats:
+                print_stats(devices)
+                next_stats += stats_interval
+
+        Poller(devices, preset, interval).run(on_sample, duration)
+    finally:
+        print_stats(devices)
+        close_devices(devices)
+
+
+def print_stats(devices: List[PolledDevice]):
+    total = 0.0
+    for device in devices:
+        print(f"[STATS] {device.spec.name}: {device.stats}")
+        total += device.stats.rate()
+    print(f"[STATS] total: rate={total:.2f}Hz")
+
+
+def run(devices: List[str], preset_name: str = "indoor-navigation", interval: float = None, duration: float = None, stats_interval: float = 10,
+        profile_path: str = None):
+    specs = [parse_device(d) for d in devices]
+    pi = pigpio.pi()
+    if not pi.connected:
+        raise Exception("pigpio connection faild...")
+    try:
+        main(pi, specs, PRESETS[preset_name], interval, duration, stats_interval, profile_path)
+    finally:
+        pi.stop()
+
+
+if __name__ == "__main__":
+    run(["spi:0", "spi:1", "i2c:0x76", "i2c:0x77"])
@@ -0,0 +1,126 @@
+# 動作モードのプリセット
+#   データシートの「3.5 Recommended modes of operation」を参照
+#   測定時間はデータシートの「9.1 Measurement time」を参照
+import enum
+from collections import OrderedDict
+from typing import NamedTuple
+
+
+# レジスタアドレス
+CHIP_ID_REG = 0xD0
+CTRL_HUM_REG = 0xF2
+STATUS_REG = 0xF3
+CTRL_MEAS_REG = 0xF4
+CONFIG_REG = 0xF5
+
+# chip_id レジスタ (0xD0) の値
+CHIP_ID = 0x60
+
+# statusレジスタ (0xF3)
+#   bit3 measuring: 変換中は1、結果がデータレジスタに転送されると0
+#   bit0 im_update: NVMのデータをイメージレジスタにコピー中は1
+STATUS_MEASURING = 0b00001000
+STATUS_IM_UPDATE = 0b00000001
+
+
+class Mode(enum.IntEnum):
+    """ctrl_meas の mode[1:0]"""
+    SLEEP = 0b00
+    FORCED = 0b01
+    NORMAL = 0b11
+
+
+# オーバーサンプリング回数 -> osrs_x[2:0] (0はスキップ)
+OVERSAMPLING = {0: 0b000, 1: 0b001, 2: 0b010, 4: 0b011, 8: 0b100, 16: 0b101}
+
+# IIRフィルター係数 -> filter[2:0] (0はフィルターなし)
+FILTER = {0: 0b000, 2: 0b001, 4: 0b010, 8: 0b011, 16: 0b100}
+
+# ノーマルモードの測定待機時間[ms] -> t_sb[2:0]
+STANDBY = {0.5: 0b000, 62.5: 0b001, 125: 0b010, 250: 0b011, 500: 0b100, 1000: 0b101, 10: 0b110, 20: 0b111}
+
+
+class Preset(NamedTuple):
+    """
+    動作モードの設定
+
+    osrs_t, osrs_p, osrs_h はオーバーサンプリング回数 (0: 測定しない)
+    filter はIIRフィルター係数 (0: フィルターなし)
+    t_standby はノーマルモードの測定待機時間[ms]
+    interval はフォースドモードで測定する間隔[sec] (0: データが揃い次第すぐに次の測定を行う)
+    """
+    name: str
+    mode: Mode
+    osrs_t: int
+    osrs_p: int
+    osrs_h: int
+    filter: int = 0
+    t_standby: float = 0.5
+    interval: float = 0
+
+    def ctrl_hum(self) -> int:
+        return OVERSAMPLING[self.osrs_h]
+
+    def ctrl_meas(self, mode: Mode = None) -> int:
+        mode = self.mode if mode is None else mode
+        return (OVERSAMPLING[self.osrs_t] << 5) | (OVERSAMPLING[self.osrs_p] << 2) | mode
+
+    def idle_mode(self) -> Mode:
+        """設定後のモード (フォースドモードは測定するとき以外スリープモードにしておく)"""
+        return Mode.SLEEP if self.mode == Mode.FORCED else self.mode
+
+    def registers(self) -> OrderedDict:
+        """設定後のレジスタの値"""
+        return OrderedDict([
+            ("ctrl_hum", self.ctrl_hum()),
+            ("ctrl_meas", self.ctrl_meas(self.idle_mode())),
+            ("config", self.config()),
+        ])
+
+    def config(self) -> int:
+        spi3w_en = 0b0  # 4線式SPI
+        return (STANDBY[self.t_standby] << 5) | (FILTER[self.filter] << 2) | spi3w_en
+
+    def measure_time_typ(self) -> float:
+        """1回の測定にかかる時間[ms] (typ)"""
+        t = 1 + 2 * self.osrs_t
+        if self.osrs_p:
+            t += 2 * self.osrs_p + 0.5
+        if self.osrs_h:
+            t += 2 * self.osrs_h + 0.5
+        return t
+
+    def measure_time_max(self) -> float:
+        """1回の測定にかかる時間[ms] (max)"""
+        t = 1.25 + 2.3 * self.osrs_t
+        if self.osrs_p:
+            t += 2.3 * self.osrs_p + 0.575
+        if self.osrs_h:
+            t += 2.3 * self.osrs_h + 0.575
+        return t
+
+    def period(self) -> float:
+        """測定周期[ms] (データシートの表と同じく typ の測定時間で計算)"""
+        if self.mode == Mode.NORMAL:
+            return self.measure_time_typ() + self.t_standby
+        return max(self.measure_time_typ(), self.interval * 1000)
+
+    def odr(self) -> float:
+        """出力データレート[Hz]"""
+        return 1000 / self.period()
+
+    def duty_cycle(self) -> float:
+        """測定している時間の割合 (0 ~ 1)"""
+        return min(1.0, self.measure_time_typ() / self.period())
+
+
+PRESETS = OrderedDict([
+    # 天気の観測: フォースドモード 1回/分, オーバーサンプリング P x1, T x1, H x1, フィルターなし
+    ("weather-monitoring", Preset("weather-monitoring", Mode.FORCED, osrs_t=1, osrs_p=1, osrs_h=1, filter=0, interval=60)),
+    # 湿度の測定: フォースドモード 1回/秒, オーバーサンプリング P x0, T x1, H x1, フィルターなし
+    ("humidity-sensing", Preset("humidity-sensing", Mode.FORCED, osrs_t=1, osrs_p=0, osrs_h=1, filter=0, interval=1)),
+    # 屋内ナビゲーション: ノーマルモード t_standby=0.5ms, オーバーサンプリング P x16, T x2, H x1, フィルター係数16
+    ("indoor-navigation", Preset("indoor-navigation", Mode.NORMAL, osrs_t=2, osrs_p=16, osrs_h=1, filter=16, t_standby=0.5)),
+    # ゲーム: ノーマルモード t_standby=0.5ms, オーバーサンプリング P x4, T x1, H x0, フィルター係数16
+    ("gaming", Preset("gaming", Mode.NORMAL, osrs_t=1, osrs_p=4, osrs_h=0, filter=16, t_standby=0.5)),
+])
@@ -0,0 +1,100 @@
+# キャリブレーションデータと設定のキャッシュ (ウォームスタート)
+#
+# 起動のたびに config, ctrl_meas, ctrl_hum を書き込み、キャリブレーションデータを読み込むのをやめるため、
+# 接続先 (spi:0, i2c:0x76 など) ごとに以下をファイルに保存しておく。
+#   - chip_id (0xD0)
+#   - キャリブレーションデータ
+#   - 最後に書き込んだレジスタの値 (ctrl_hum, ctrl_meas, config)
+#
+# 再起動時は chip_id (0xD0) と 0xF2 ~ 0xF5 (ctrl_hum, status, ctrl_meas, config) を読み込んで、保存した値と一致すれば
+# センサーはリセット (電源断) されておらず、保存したキャリブレーションデータも同じセンサーのものとみなす。
+# (リセット後のレジスタの値は0x00なので、設定済みのセンサーと区別できる。
+#  chip_id が違えば別の種類のセンサー (BMP280 など) に差し替えられているので、最初から初期化する)
+import json
+import os
+from collections import OrderedDict
+from typing import Optional
+from bme280.bme280 import Bme280
+from bme280.presets import Preset, CHIP_ID_REG, CHIP_ID, CTRL_HUM_REG
+
+
+DEFAULT_PROFILE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "iot-work", "bme280_profiles.json")
+
+
+class ProfileStore:
+    """接続先ごとのプロファイルをJSONファイルに保存する"""
+
+    def __init__(self, path: str = DEFAULT_PROFILE_PATH):
+        self.path = path
+        self._profiles = None
+
+    def _load(self) -> dict:
+        if self._profiles is None:
+            try:
+                with open(self.path) as f:
+                    self._profiles = json.load(f)
+            except (FileNotFoundError, ValueError):
+                self._profiles = {}
+        return self._profiles
+
+    def get(self, location: str) -> Optional[dict]:
+        return self._load().get(location)
+
+    def put(self, location: str, profile: dict):
+        profiles = self._load()
+        profiles[location] = profile
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # 書き込み途中で落ちても壊れないように、一時ファイルに書いてから置き換える
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(profiles, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def read_registers(sensor: Bme280) -> OrderedDict:
+    """ctrl_hum ~ config (0xF2 ~ 0xF5) を1回で読み込む"""
+    data = sensor.transport.read(CTRL_HUM_REG, 4)
+    return OrderedDict([
+        ("ctrl_hum", data[0]),
+        ("ctrl_meas", data[2]),
+        ("config", data[3]),
+    ])
+
+
+def warm_start(sensor: Bme280, preset: Preset, store: ProfileStore) -> bool:
+    """
+    保存したプロファイルを使ってセンサーを初期化する
+
+    - chip_id とレジスタの値がプロファイルと一致: キャリブレーションデータの読み込みを省略する
+      さらにプリセットの設定も一致していれば、レジスタの書き込みも省略する
+    - 一致しない (初回起動, センサーのリセット後など): chip_idを確認して通常通り初期化し、プロファイルを保存する
+
+    戻り値: キャリブレーションデータの読み込みを省略できた場合はTrue
+    """
+    location = sensor.transport.name
+    profile = store.get(location)
+    expected = preset.registers()
+    chip_id = sensor.transport.read(CHIP_ID_REG, 1)[0]
+
+    if profile is not None and profile.get("chip_id") == chip_id:
+        current = read_registers(sensor)
+        if current == OrderedDict(profile["registers"]) and any(current.values()):
+            sensor.set_calibration(OrderedDict(profile["cal_data"]))
+            if current == expected:
+                sensor.configure(preset, write=False)
+            else:
+                sensor.configure(preset)
+                profile["registers"] = expected
+                store.put(location, profile)
+            return True
+
+    if chip_id != CHIP_ID:
+        raise Exception(f"ChipIdError: chip_id=0x{chip_id:02x} (expected=0x{CHIP_ID:02x}) at {location}")
+    sensor.configure(preset)
+    sensor.read_calibration()
+    store.put(location, {
+        "chip_id": chip_id,
+        "cal_data": sensor.cal_data,
+        "registers": expected,
+    })
+    return False
@@ -0,0 +1,69 @@
+# 7セグ表示器に表示するフレームを、値を更新するスレッドから表示するスレッドへ受け渡す
+#
+# counter.py / temp_sensor.py は data (各桁の値のリスト) を共有し、refresh() がその場で書き換えていたので、
+# 表示するスレッドが書き換えの途中のフレーム (前の値と新しい値が混ざった桁) を表示することがあった。
+# ここでは
+#   - 更新する側は新しいフレーム (各桁の値のタプル) を別に作り、FrameSlot.publish() で参照を1回入れ替える
+#     (属性への代入は1回の操作なので、表示する側は古いフレームか新しいフレームのどちらかしか見ない)
+#   - フレームには generation (publish するたびに1増える) を付け、表示する側は generation が変わったときだけ
+#     マスクの計算 (SegmentBank.compile) や wave の作り直しをする
+#   - FrameStats で表示のループのリフレッシュレートと、publish してから表示されるまでの時間 (フレームの古さ) を集計する
+import time
+from typing import NamedTuple, Optional, Sequence, Tuple
+
+
+class Frame(NamedTuple):
+    shapes: Tuple[int, ...]  # 各桁の SEG_SHAPE の値 (ドットは bit7)
+    text: str                # 表示している文字列 (ログ用)
+    generation: int
+    created: float           # publish した時刻 (time.monotonic())
+
+
+class FrameSlot:
+    """最新のフレームを1つだけ持つ (publish するスレッドは1つだけにする)"""
+
+    def __init__(self, digits: int = 4):
+        self.frame = Frame((0,) * digits, "", 0, time.monotonic())
+
+    def publish(self, shapes: Sequence[int], text: str = "") -> Frame:
+        frame = Frame(tuple(shapes), text, self.frame.generation + 1, time.monotonic())
+        self.frame = frame
+        return frame
+
+
+class FrameStats:
+    """表示する側の統計"""
+
+    def __init__(self):
+        self.start = time.monotonic()
+        self.refreshes = 0   # 全桁を1周表示した回数
+        self.frames = 0      # 表示したフレームの数
+        self.skipped = 0     # 表示する前に次のフレームに置き換わったフレームの数
+        self.age_sum = 0.0
+        self.age_max = 0.0
+        self.refresh_hz: Optional[float] = None  # wave で表示する場合のリフレッシュレート (DMA が決める)
+        self._generation: Optional[int] = None
+
+    def refresh(self):
+        self.refreshes += 1
+
+    def changed(self, frame: Frame) -> bool:
+        """新しいフレームなら True を返し、publish してからの時間を記録する"""
+        if frame.generation == self._generation:
+            return False
+        if self._generation is not None:
+            self.skipped += max(0, frame.generation - self._generation - 1)
+        self._generation = frame.generation
+        if frame.generation > 0:
+            age = time.monotonic() - frame.created
+            self.frames += 1
+            self.age_sum += age
+            self.age_max = max(self.age_max, age)
+        return True
+
+    def __str__(self) -> str:
+        elapsed = time.monotonic() - self.start
+        age_mean = self.age_sum / self.frames if self.frames else 0.0
+        refresh = f"{self.refresh_hz:.1f}Hz (wave)" if self.refresh_hz else f"{self.refreshes / elapsed:.1f}Hz"
+        return (f"refresh={refresh}, frames={self.frames}, skipped={self.skipped}, "
+                f"frame age(mean)={age_mean * 1000:.2f}ms, frame age(max)={self.age_max * 1000:.2f}ms")
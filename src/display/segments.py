@@ -0,0 +1,174 @@
+# 7セグ表示器 (ダイナミック制御) の GPIO をバンク単位でまとめて書き込む
+#
+# counter.py / temp_sensor.py の display() は1桁を表示するたびに
+#   カソードLOW (1回) + セグメント (7回) + ドット (1回) + セグメントのクリア (7回) + ドットのクリア (1回) + カソードHIGH (1回)
+# の18回 pi.write を呼び出していて、1回ごとに pigpiod とのソケット通信が発生する。
+# 書き込みの間にも時間がかかるので、リフレッシュレートが上がらず、桁ごとの点灯時間もばらつく。
+#
+# pigpio の set_bank_1 / clear_bank_1 は GPIO 0 ~ 31 のうちビットマスクで指定したピンをまとめて HIGH / LOW にする
+# (BCM の GPSET0 / GPCLR0 レジスタへの1回の書き込みなので、マスクのピンは同時に変わる)。
+# 桁ごとの (clear, set) のマスクをあらかじめ作っておき、桁の切り替えは次の2回の呼び出しだけにする。
+#   - clear_bank_1: すべてのセグメントとドットを消灯 + 次の桁のカソードをLOW
+#                   (セグメントがすべて消えているので、前の桁のカソードがLOWのままでも何も光らない)
+#   - set_bank_1  : 前の桁のカソードをHIGH + 次の桁のセグメントを点灯 (同時に変わるので前の桁に残像が出ない)
+#
+# 実行方法 (切り替え前後のリフレッシュレートと桁ごとの点灯時間の比較)
+#   ./bin/cli display-bench -n 200
+import time
+from typing import List, NamedTuple, Sequence, Tuple
+import pigpio
+
+# ドットは SEG_SHAPE の bit7
+DP_BIT = 7
+
+
+class SegmentPins(NamedTuple):
+    """7セグ表示器につないだ GPIO (counter.py, temp_sensor.py の SEG_GPIO, DP_GPIO, DIGIT_GPIO)"""
+    seg: Sequence[int]     # a -> g の順
+    dp: int
+    digits: Sequence[int]  # data と同じ順 (DIGIT_GPIO の順)
+
+    def all(self) -> List[int]:
+        return list(self.seg) + [self.dp] + list(self.digits)
+
+
+def bit(gpio: int) -> int:
+    if not 0 <= gpio < 32:
+        raise ValueError(f"invalid gpio: {gpio} (bank 1 is GPIO 0 - 31)")
+    return 1 << gpio
+
+
+class SegmentBank:
+    """SEG_SHAPE の値 (a -> g が bit0 ~ bit6, ドットが bit7) をバンクのマスクに変換する"""
+
+    def __init__(self, pins: SegmentPins):
+        self.pins = pins
+        self.segment_mask = sum(bit(gpio) for gpio in pins.seg) | bit(pins.dp)
+        self.digit_masks = [bit(gpio) for gpio in pins.digits]
+        self.digit_mask = sum(self.digit_masks)
+        # 256通りの値のマスクを作っておく (表示のループでは表を引くだけ)
+        self.shape_masks = [self._shape_mask(shape) for shape in range(256)]
+
+    def _shape_mask(self, shape: int) -> int:
+        mask = 0
+        for i, gpio in enumerate(self.pins.seg):
+            if shape >> i & 1:
+                mask |= bit(gpio)
+        if shape >> DP_BIT & 1:
+            mask |= bit(self.pins.dp)
+        return mask
+
+    def compile(self, data: Sequence[int]) -> List[Tuple[int, int]]:
+        """
+        各桁を表示するときの (clear_bank_1 のマスク, set_bank_1 のマスク) のリスト
+        (1つ目の桁は最後の桁から切り替える。1桁だけの場合は切り替える前の桁がないのでカソードはLOWのまま)
+        """
+        steps = []
+        digits = len(data)
+        for digit, shape in enumerate(data):
+            previous = self.digit_masks[(digit - 1) % digits] if digits > 1 else 0
+            steps.append((self.segment_mask | self.digit_masks[digit], previous | self.shape_masks[shape & 0xFF]))
+        return steps
+
+    def off(self, pi):
+        """すべての桁を消灯する (セグメントをLOW, カソードをHIGH)"""
+        pi.clear_bank_1(self.segment_mask)
+        pi.set_bank_1(self.digit_mask)
+
+
+def show_per_pin(pi, pins: SegmentPins, digit: int, shape: int):
+    """今までの display() と同じく1ピンずつ書き込んで digit 桁目を点灯する"""
+    pi.write(pins.digits[digit], 0)
+    for i in range(0, 7):
+        pi.write(pins.seg[i], (shape >> i) & 1)
+    pi.write(pins.dp, (shape >> DP_BIT) & 1)
+
+
+def hide_per_pin(pi, pins: SegmentPins, digit: int):
+    for gpio in pins.seg:
+        pi.write(gpio, 0)
+    pi.write(pins.dp, 0)
+    pi.write(pins.digits[digit], 1)
+
+
+class OnTimeStats:
+    """桁ごとの点灯時間 (点灯の書き込みが終わってから消灯の書き込みが終わるまで) と1周の時間"""
+
+    def __init__(self, digits: int):
+        self.on_times: List[List[float]] = [[] for _ in range(digits)]
+        self.frames = 0
+        self.elapsed = 0.0
+
+    def summary(self) -> str:
+        lines = [f"refresh={self.frames / self.elapsed:.1f}Hz" if self.elapsed else "refresh=-"]
+        for digit, times in enumerate(self.on_times):
+            if times:
+                lines.append(f"  digit{digit}: on-time mean={sum(times) / len(times) * 1000:.3f}ms "
+                             f"min={min(times) * 1000:.3f}ms max={max(times) * 1000:.3f}ms")
+        return "\n".join(lines)
+
+
+def bench_per_pin(pi, pins: SegmentPins, data: Sequence[int], frames: int, on_time: float) -> OnTimeStats:
+    stats = OnTimeStats(len(data))
+    start = time.perf_counter()
+    for _ in range(frames):
+        for digit, shape in enumerate(data):
+            show_per_pin(pi, pins, digit, shape)
+            on = time.perf_counter()
+            time.sleep(on_time)
+            hide_per_pin(pi, pins, digit)
+            stats.on_times[digit].append(time.perf_counter() - on)
+    stats.elapsed = time.perf_counter() - start
+    stats.frames = frames
+    return stats
+
+
+def bench_bank(pi, bank: SegmentBank, data: Sequence[int], frames: int, on_time: float) -> OnTimeStats:
+    """点灯時間は set_bank_1 が終わってから次の桁の clear_bank_1 (消灯) が終わるまで"""
+    stats = OnTimeStats(len(data))
+    steps = bank.compile(data)
+    start = time.perf_counter()
+    on = None
+    for _ in range(frames):
+        for digit, (clear, set_) in enumerate(steps):
+            pi.clear_bank_1(clear)
+            if on is not None:
+                stats.on_times[digit - 1].append(time.perf_counter() - on)
+            pi.set_bank_1(set_)
+            on = time.perf_counter()
+            time.sleep(on_time)
+    bank.off(pi)
+    stats.on_times[-1].append(time.perf_counter() - on)
+    stats.elapsed = time.perf_counter() - start
+    stats.frames = frames
+    return stats
+
+
+def bench(pi, pins: SegmentPins, data: Sequence[int], frames: int = 200, on_time: float = 0.001):
+    for gpio in pins.all():
+        pi.set_mode(gpio, pigpio.OUTPUT)
+    bank = SegmentBank(pins)
+    bank.off(pi)
+    try:
+        print(f"[per-pin] {len(pins.seg) * 2 + 4} writes/digit")
+        print(bench_per_pin(pi, pins, data, frames, on_time).summary())
+        print("[bank] 2 writes/digit (clear_bank_1 + set_bank_1)")
+        print(bench_bank(pi, bank, data, frames, on_time).summary())
+    finally:
+        bank.off(pi)
+
+
+def run(frames: int = 200, on_time: float = 0.001):
+    from display.counter import PINS, SEG_SHAPE
+    pi = pigpio.pi()
+    if not pi.connected:
+        raise Exception("pigpio connection faild...")
+    try:
+        data = [SEG_SHAPE["8"] | 1 << DP_BIT] * len(PINS.digits)  # すべてのセグメントを点灯する
+        bench(pi, PINS, data, frames, on_time)
+    finally:
+        pi.stop()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,193 @@
+# 74HC595 (シフトレジスター) をつないだ7セグ表示器をハードウェアSPIでダイナミック制御する
+#
+# counter.py / temp_sensor.py は1つの4桁の表示器に12本の GPIO を使うので、表示器を増やせない。
+# ここでは 74HC595 をデイジーチェーンにして SPI (MOSI, SCLK, CE) の3本だけでつなぐ。
+#   - 1つ目の 74HC595 (MOSI に近い方): セグメント (Q0 ~ Q6 = a ~ g, Q7 = ドット。SEG_SHAPE の値がそのまま入る)
+#   - 2つ目以降の 74HC595: 桁の選択 (8桁ごとに1つ。2つ目の Q0 が1桁目)
+#   - RCLK (ラッチ) は CE につなぐ (CE が HIGH に戻るときに全レジスターの出力が同時に切り替わる)
+# 最後に送ったバイトが1つ目の 74HC595 に残るので、1ステップは
+#   [最後の桁選択レジスター, ..., 2つ目 (桁選択), 1つ目 (セグメント)] の 1 + ceil(桁数 / 8) バイト
+# を1回の転送で送る。桁のカソードは 74HC595 に直接つなぐとLOWで点灯 (digit_active_low=True)、
+# トランジスターアレイ (ULN2803 など) を挟むとHIGHで点灯 (digit_active_low=False)。
+# 1フレームの最後にはすべて消灯するステップ (blank) を付ける。最後の桁のあとに何もラッチしないと、
+# 次の転送 (Python のループと ioctl の準備) の間も最後の桁だけ点灯したままになり、ほかの桁より明るくなる。
+# blank の分 (1ステップ) だけ全体の点灯の割合は下がるが、どの桁も同じ点灯時間になる。
+#
+# 転送の方法
+#   - spidev : 全桁のステップを SPI_IOC_MESSAGE の1回の ioctl で送る。ステップごとに delay_usecs (点灯時間) 待ってから
+#              CE を戻す (= ラッチする) ので、点灯時間はカーネルが作る。1フレームのシステムコールは桁数によらず1回
+#              (delay_usecs は u16 なので点灯時間は 65535us まで)
+#   - pigpio : ステップごとに spi_write を呼んで Python で sleep する
+#
+# 実行方法
+#   ./bin/cli display-shift-register --digits 8
+#   ./bin/cli display-bench-shift-register --digits 4 --digits 8 --digits 16 --digits 32 --fake
+import threading
+import time
+from typing import List, Sequence
+import pigpio
+from display.counter import SEG_SHAPE, refresh
+from display.frame import FrameSlot, FrameStats
+from temp_sensor.temp_spidev import SpiDev
+
+ON_US = 1000  # 1桁の点灯時間[us]
+CLOCK_SPEED = 1000000  # 1MHz (74HC595 は 3.3V でも数MHz まで動く)
+
+
+class ShiftRegisterChain:
+    """桁数に合わせた 74HC595 のチェーンに送るバイト列を作る"""
+
+    def __init__(self, digits: int, digit_active_low: bool = True):
+        if digits < 1:
+            raise ValueError(f"invalid digits: {digits}")
+        self.digits = digits
+        self.digit_active_low = digit_active_low
+        self.digit_registers = (digits + 7) // 8
+        self.registers = 1 + self.digit_registers  # 1ステップのバイト数
+        self._selects = [self._select(digit) for digit in range(digits)]
+        self.blank = self._pack(0, self._select(None))
+
+    def _select(self, digit) -> int:
+        bits = 0 if digit is None else 1 << digit
+        if self.digit_active_low:
+            bits ^= (1 << 8 * self.digit_registers) - 1
+        return bits
+
+    def _pack(self, shape: int, select: int) -> bytes:
+        return select.to_bytes(self.digit_registers, "big") + bytes([shape & 0xFF])
+
+    def compile(self, shapes: Sequence[int]) -> bytes:
+        """1フレーム (全桁のステップ + 最後に消灯するステップ) のバイト列"""
+        if len(shapes) != self.digits:
+            raise ValueError(f"invalid frame: {len(shapes)} digits (chain has {self.digits} digits)")
+        return b"".join(self._pack(shape, select) for shape, select in zip(shapes, self._selects)) + self.blank
+
+
+class PigpioSteps:
+    """pigpio の spi_write でステップごとに送り、Python で点灯時間を待つ"""
+
+    def __init__(self, pi, spi_handler, on_us: int):
+        self.pi = pi
+        self.spi_handler = spi_handler
+        self.on_time = on_us / 1e6
+
+    def transfer(self, tx_data: bytes, frame_size: int):
+        for i in range(0, len(tx_data), frame_size):
+            self.pi.spi_write(self.spi_handler, tx_data[i:i + frame_size])
+            if self.on_time:
+                time.sleep(self.on_time)
+
+    def close(self):
+        self.pi.spi_close(self.spi_handler)
+
+
+class FakeShiftRegister:
+    """74HC595 のチェーンの代わり (ラッチされた出力を記録し、ステップごとの点灯時間だけ待つ)"""
+
+    def __init__(self, registers: int, on_us: int = 0):
+        self.registers = registers
+        self.on_time = on_us / 1e6
+        self.latched = b""
+        self.ioctl_count = 0
+
+    def transfer(self, tx_data: bytes, frame_size: int):
+        if frame_size != self.registers or len(tx_data) % frame_size:
+            raise ValueError(f"invalid transfer: {len(tx_data)} bytes / {frame_size} (chain has {self.registers} registers)")
+        self.latched = tx_data[-frame_size:]
+        self.ioctl_count += 1
+        if self.on_time:
+            time.sleep(self.on_time * (len(tx_data) // frame_size))
+
+    def close(self):
+        pass
+
+
+def open_dev(chain: ShiftRegisterChain, backend: str, chip_select: int, clock: int, on_us: int, fake: bool):
+    """(dev, pi) を返す (pi は pigpio を使う場合だけ)"""
+    SPI_MODE = 0b00  # 74HC595 は SCLK の立ち上がりでシフトする (モード0)
+    if fake:
+        return FakeShiftRegister(chain.registers, on_us), None
+    if backend == "pigpio":
+        pi = pigpio.pi()
+        if not pi.connected:
+            raise Exception("pigpio connection faild...")
+        return PigpioSteps(pi, pi.spi_open(chip_select, clock, SPI_MODE), on_us), pi
+    return SpiDev(0, chip_select, clock, SPI_MODE, delay_usecs=on_us), None
+
+
+def display(dev, chain: ShiftRegisterChain, slot: FrameSlot, stats: FrameStats, stop: threading.Event):
+    """フレームが変わったときだけバイト列を作り直し、1フレームずつ送り続ける"""
+    tx = chain.blank
+    while not stop.is_set():
+        frame = slot.frame
+        if stats.changed(frame):
+            tx = chain.compile(frame.shapes)
+        dev.transfer(tx, chain.registers)
+        stats.refresh()
+
+
+def counter(slot: FrameSlot, digits: int, stop: threading.Event):
+    """counter.py の counter と同じく 0.1 ずつカウントアップする"""
+    cnt = -15
+    while not stop.wait(0.1):
+        cnt = round(cnt, 2) + 0.1
+        data = [0] * digits
+        try:
+            ret = refresh(cnt, data)
+        except IndexError:  # 桁があふれたら最初から数え直す
+            cnt = -15
+            continue
+        slot.publish(data, ret)
+
+
+def main(digits: int = 8, backend: str = "spidev", chip_select: int = 0, clock: int = CLOCK_SPEED, on_us: int = ON_US,
+         digit_active_low: bool = True, fake: bool = False):
+    chain = ShiftRegisterChain(digits, digit_active_low)
+    dev, pi = open_dev(chain, backend, chip_select, clock, on_us, fake)
+    slot = FrameSlot(digits)
+    stats = FrameStats()
+    stop = threading.Event()
+    worker = threading.Thread(target=counter, args=(slot, digits, stop), daemon=True)
+    worker.start()
+    print(f"[INFO] digits={digits}, registers={chain.registers}, bytes/frame={chain.registers * (digits + 1)}, backend={backend}")
+    try:
+        display(dev, chain, slot, stats, stop)
+    finally:
+        stop.set()
+        dev.transfer(chain.blank, chain.registers)
+        dev.close()
+        if pi is not None:
+            pi.stop()
+        print(f"[STATS] {stats}")
+
+
+def bench(digit_counts: List[int], backend: str = "spidev", chip_select: int = 0, clock: int = CLOCK_SPEED,
+          on_us: int = 0, frames: int = 200, fake: bool = False):
+    """
+    チェーンの長さ (桁数) ごとのリフレッシュレート
+      - bus: クロックから計算した上限 (点灯時間は含まない)
+      - on_us=0 で転送だけの速さ (桁数が増えても1フレームの ioctl は1回)、
+        on_us を指定すると点灯時間を含めた実際のリフレッシュレートになる
+    """
+    print(f"{'digits':>7} {'bytes/frame':>12} {'bus[Hz]':>10} {'refresh[Hz]':>12} {'us/frame':>10} {'calls/frame':>12}")
+    for digits in digit_counts:
+        chain = ShiftRegisterChain(digits)
+        dev, pi = open_dev(chain, backend, chip_select, clock, on_us, fake)
+        try:
+            tx = chain.compile([SEG_SHAPE["8"]] * digits)
+            start = time.perf_counter()
+            for _ in range(frames):
+                dev.transfer(tx, chain.registers)
+            elapsed = time.perf_counter() - start
+            dev.transfer(chain.blank, chain.registers)
+        finally:
+            dev.close()
+            if pi is not None:
+                pi.stop()
+        calls = len(tx) // chain.registers if isinstance(dev, PigpioSteps) else 1
+        bus = clock / (len(tx) * 8)
+        print(f"{digits:>7} {len(tx):>12} {bus:>10.0f} {frames / elapsed:>12.1f} {elapsed / frames * 1e6:>10.1f} {calls:>12}")
+
+
+if __name__ == "__main__":
+    main(fake=True)
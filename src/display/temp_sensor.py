@@ -1,6 +1,12 @@
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, wait
+import threading
 import time
 import pigpio
+from display import wave as segment_wave
+from display.frame import FrameSlot, FrameStats
+from display.segments import SegmentBank, SegmentPins
+from display.timing import MultiplexStats, SleepPacer, pacer as make_pacer
+from temp_sensor.calibration import load_table
 
 SEG_SHAPE = {
     # g -> aの順
@@ -28,40 +34,45 @@ SEG_GPIO = [21, 22, 23, 24, 25, 26, 27]
 DP_GPIO = 6
 # 表示する桁を制御するGPIO (4桁目 -> 1桁目 の順)
 DIGIT_GPIO = [20, 19, 18, 17]
-
-def display(pi, data: list[int]):
-    """ダイナミック制御で4桁の7セグを表示する関数"""
-    while True:
+PINS = SegmentPins(SEG_GPIO, DP_GPIO, DIGIT_GPIO)
+
+def display(pi, slot: FrameSlot, stats: FrameStats, stop: threading.Event,
+            pacer=None, mux: MultiplexStats = None):
+    """
+    ダイナミック制御で4桁の7セグを表示する関数
+    桁の切り替えは clear_bank_1 + set_bank_1 の2回だけ (segments.py)
+    マスクはフレームが変わったとき (generation が変わったとき) だけ作り直す (frame.py)
+    桁を切り替える間隔は pacer が決める (timing.py。省略すると sleep(0.001))
+    mux を渡すと桁ごとの点灯時間とフレーム周期を記録する
+    """
+    bank = SegmentBank(PINS)
+    pacer = pacer or SleepPacer()
+    steps = []
+    pacer.start()
+    while not stop.is_set():
+        frame = slot.frame
+        if stats.changed(frame):
+            steps = bank.compile(frame.shapes)
         # 各桁を順番に高速で点灯させることで全桁表示しているように見せる
-        for digit, seg_shape in enumerate(data):
-            ############################
-            # 点灯
-            ############################
-            # カソード側: LOW
-            pi.write(DIGIT_GPIO[digit], 0)
-
-            # アノード側(7セグ表示): (点灯するセグメントに対応するGPIOをHIGHにする)
-            for i in range(0, 7):
-                pi.write(SEG_GPIO[i], (seg_shape >> i) & 1)
-
-            # アノード側(ドット表示): (最上位ビットが1ならドットに対応するGPIOをHIGHにする)
-            pi.write(DP_GPIO, (seg_shape >> 7) & 1)
-
-            time.sleep(0.001)
-
-            ############################
-            # 消灯
-            ############################
-            # アノード側: すべてのGPIOをLOWにする
-            for i in SEG_GPIO:
-                pi.write(i, 0)
-            pi.write(DP_GPIO, (seg_shape >> 7) & 0)
-
-            # カソード側: HIGH
-            pi.write(DIGIT_GPIO[digit], 1)
-
-def task(pi, spi_handler, data: list[int]):
+        # 消灯: すべてのセグメントをLOW + この桁のカソードをLOW (clear)
+        # 点灯: 前の桁のカソードをHIGH + この桁のセグメントをHIGH (set)
+        for digit, (clear, set_) in enumerate(steps):
+            pi.clear_bank_1(clear)
+            if mux:
+                mux.off()
+            pi.set_bank_1(set_)
+            if mux:
+                mux.on(digit)
+            pacer.wait()
+        stats.refresh()
+    bank.off(pi)
+    if mux:
+        mux.off()
+
+
+def task(pi, spi_handler, slot: FrameSlot):
     VREF = 3.3  # A/Dコンバータの基準電圧
+    table = load_table()  # 値 -> 温度の変換テーブル (保存した "default" のキャリブレーション)
     CHANNEL = 0  # MCP3002のCH0端子,CH1端子どちらを利用するか
     while True:
         # 1bit: 0固定
@@ -78,8 +89,9 @@ def task(pi, spi_handler, data: list[int]):
             continue
         value = int.from_bytes(read_data, "big") & 0b1111111111  # 10ビットを値として取り出す
         volt = (value / 1023.0) * VREF  # 温度センサーから入力された電圧
-        temp = (volt - 0.6) / 0.01  # 電圧を温度に変換。(0℃で600mV , 1℃につき10mV増減)
-        refresh(temp, data)
+        temp = table[value]  # 温度に変換 (公称の式なら 0℃で600mV , 1℃につき10mV増減)
+        data = [0] * len(DIGIT_GPIO)  # 次のフレームは共有しないリストで作ってから publish する
+        slot.publish(data, refresh(temp, data))
         print(f"value: {value}, volt: {volt}, temp: {temp}")
         time.sleep(3)
 
@@ -108,7 +120,12 @@ def init_gpio(pi):
     for gpio in DIGIT_GPIO:
         pi.write(gpio, 1)
 
-def main():
+def main(wave: bool = False, timing: str = "sleep", show_stats: bool = False):
+    """
+    wave=True の場合は pigpio の wave (DMA) で表示する (wave.py)
+    timing は桁を切り替える間隔の決め方 (sleep, deadline。timing.py)
+    show_stats=True の場合は終了時に桁ごとの点灯時間・フレーム周期・ジッターを表示する
+    """
 
     pi = pigpio.pi()
     if not pi.connected:
@@ -122,23 +139,38 @@ def main():
     spi_handler = pi.spi_open(CHIP_SELECT, CLOCK_SPEED, OPTION)
 
     # すべてのGPIOをOUTPUTに設定
-    for gpio in SEG_GPIO + DIGIT_GPIO:
+    for gpio in SEG_GPIO + [DP_GPIO] + DIGIT_GPIO:
         pi.set_mode(gpio, pigpio.OUTPUT)
 
     # GPIOの初期化
     init_gpio(pi)
     # 温度測定とディスプレイ表示は別スレッドで動かす
     with ThreadPoolExecutor(max_workers=2) as executor:
-        data = [0, 0, 0, 0]  # 各桁の点灯するセグメントがbitで格納される(displayとtaskの共有データ)
-        display_future = executor.submit(display, pi, data)
-        counter_future = executor.submit(task, pi, spi_handler, data)
+        slot = FrameSlot(len(DIGIT_GPIO))  # 表示するフレーム (displayとtaskの共有データ。publish で丸ごと入れ替える)
+        stats = FrameStats()
+        stop = threading.Event()
+        pacer = make_pacer(timing)
+        mux = MultiplexStats(len(DIGIT_GPIO), pacer.on_time) if show_stats else None
+        if wave:
+            display_future = executor.submit(segment_wave.display, pi, PINS, slot, stats, stop)
+        else:
+            display_future = executor.submit(display, pi, slot, stats, stop, pacer, mux)
+        counter_future = executor.submit(task, pi, spi_handler, slot)
         try:
             counter_future.result()
             display_future.result()
         finally:
+            stop.set()
+            wait([display_future], timeout=1.0)  # 表示のループを止めてから pigpio を閉じる
             pi.spi_close(spi_handler)
             init_gpio(pi)
             pi.stop()
+            print(f"[STATS] {stats}")
+            if mux is not None:
+                if wave:
+                    print(f"[MUX] wave: on-time={segment_wave.ON_US}us (DMA)")
+                else:
+                    print(f"[MUX] timing={timing}, overruns={pacer.overruns}\n{mux.summary()}")
             print("[INFO] GPIO close.")
 
 
@@ -0,0 +1,142 @@
+# 7セグ表示器のダイナミック制御のタイミング (桁を切り替える間隔) と、点灯時間・ちらつきの計測
+#
+# counter.py / temp_sensor.py の display() は桁を切り替えるたびに time.sleep(0.001) していた。
+# sleep は指定した時間より長く眠ることがあり (スケジューラー次第で 0.1ms ~ 数ms)、
+# 切り替えの書き込み (clear_bank_1 + set_bank_1) の時間もその後ろに足されるので、
+#   - 桁ごとの点灯時間がばらつく (明るさがそろわない)
+#   - 1周の時間 (フレーム周期) が伸び縮みする (ちらつき)
+# ここでは桁を切り替える間隔の決め方 (pacer) を2つ用意する。
+#   - sleep   : 今まで通り、切り替えのあとに on_time だけ sleep する (SleepPacer)
+#   - deadline: 切り替える時刻 (締め切り) を最初の時刻から on_time ずつ進めた絶対時刻で決める (DeadlinePacer)
+#               締め切りの spin 秒前までは sleep し、残りは time.perf_counter() を見ながら待つ。
+#               書き込みの時間や sleep の寝過ごしは次の桁に持ち越されないので、どの桁も同じ間隔で切り替わる
+# MultiplexStats は切り替えの時刻から
+#   - 桁ごとの点灯時間 (set_bank_1 が終わってから、次の桁の clear_bank_1 で消えるまで)
+#   - フレーム周期 (1桁目が点灯してから次に1桁目が点灯するまで)
+#   - ジッター (点灯時間の on_time からのずれ、フレーム周期の中央値からのずれ)
+# のパーセンタイルを集計する (直近 WINDOW 個のサンプル)。
+#
+# 実行方法
+#   ./bin/cli display-counter --stats
+#   ./bin/cli display-counter --timing deadline --stats
+import time
+from collections import deque
+from typing import Deque, List, Optional
+
+ON_TIME = 0.001  # 1桁の点灯時間[sec]
+SPIN = 0.0002    # 締め切りの何秒前から sleep をやめて待つか[sec]
+WINDOW = 5000    # パーセンタイルを求めるサンプルの数 (桁ごと)
+TIMINGS = ["sleep", "deadline"]
+
+
+def percentile(values: List[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def ms(value: float) -> str:
+    return f"{value * 1000:.3f}ms"
+
+
+class SleepPacer:
+    """切り替えのあとに on_time だけ sleep する (今までの display() と同じ)"""
+
+    def __init__(self, on_time: float = ON_TIME):
+        self.on_time = on_time
+        self.overruns = 0
+
+    def start(self):
+        pass
+
+    def wait(self):
+        time.sleep(self.on_time)
+
+
+class DeadlinePacer:
+    """最初の時刻から on_time ずつ進めた締め切りまで待つ"""
+
+    def __init__(self, on_time: float = ON_TIME, spin: float = SPIN):
+        self.on_time = on_time
+        self.spin = spin
+        self.deadline = 0.0
+        self.overruns = 0  # 締め切りを1桁分以上過ぎていたので、締め切りを今の時刻からやり直した回数
+
+    def start(self):
+        self.deadline = time.perf_counter() + self.on_time
+
+    def wait(self):
+        now = time.perf_counter()
+        if now > self.deadline + self.on_time:
+            # GC などで大きく遅れたときは、遅れを取り戻そうとして短い点灯を続けないようにやり直す
+            self.overruns += 1
+            self.deadline = now + self.on_time
+            return
+        remain = self.deadline - now - self.spin
+        if remain > 0:
+            time.sleep(remain)
+        while time.perf_counter() < self.deadline:
+            pass
+        self.deadline += self.on_time
+
+
+def pacer(timing: str = "sleep", on_time: float = ON_TIME):
+    if timing == "sleep":
+        return SleepPacer(on_time)
+    if timing == "deadline":
+        return DeadlinePacer(on_time)
+    raise ValueError(f"invalid timing: {timing} ({', '.join(TIMINGS)})")
+
+
+class MultiplexStats:
+    """桁ごとの点灯時間・フレーム周期・ジッター"""
+
+    def __init__(self, digits: int, on_time: float = ON_TIME, window: int = WINDOW):
+        self.on_time = on_time
+        self.on_times: List[Deque[float]] = [deque(maxlen=window) for _ in range(digits)]
+        self.periods: Deque[float] = deque(maxlen=window)
+        self._digit: Optional[int] = None  # 点灯中の桁
+        self._on = 0.0                     # 点灯中の桁が点灯した時刻
+        self._first = None                 # 1桁目が点灯した時刻
+
+    def off(self):
+        """clear_bank_1 (点灯中の桁の消灯) のあとに呼ぶ"""
+        if self._digit is not None:
+            self.on_times[self._digit].append(time.perf_counter() - self._on)
+            self._digit = None
+
+    def on(self, digit: int):
+        """set_bank_1 (digit 桁目の点灯) のあとに呼ぶ"""
+        now = time.perf_counter()
+        if digit == 0:
+            if self._first is not None:
+                self.periods.append(now - self._first)
+            self._first = now
+        self._digit = digit
+        self._on = now
+
+    def summary(self) -> str:
+        periods = list(self.periods)
+        if not periods:
+            return "no samples"
+        median = percentile(periods, 50)
+        period_jitter = [abs(v - median) for v in periods]
+        lines = [f"refresh={1 / (sum(periods) / len(periods)):.1f}Hz, "
+                 f"frame period p50={ms(median)} p95={ms(percentile(periods, 95))} "
+                 f"p99={ms(percentile(periods, 99))} max={ms(max(periods))}, "
+                 f"jitter p95={ms(percentile(period_jitter, 95))} p99={ms(percentile(period_jitter, 99))}"]
+        means = []
+        for digit, samples in enumerate(self.on_times):
+            times = list(samples)
+            if not times:
+                continue
+            mean = sum(times) / len(times)
+            means.append(mean)
+            on_jitter = [abs(v - self.on_time) for v in times]
+            lines.append(f"  digit{digit}: on-time mean={ms(mean)} p50={ms(percentile(times, 50))} "
+                         f"p95={ms(percentile(times, 95))} p99={ms(percentile(times, 99))} "
+                         f"min={ms(min(times))} max={ms(max(times))}, "
+                         f"jitter p99={ms(percentile(on_jitter, 99))}, duty={mean / median * 100:.1f}%")
+        if means:
+            # 点灯時間の平均が一番長い桁と短い桁の差 (明るさのむら)
+            lines.append(f"  brightness spread={(max(means) - min(means)) / max(means) * 100:.1f}%")
+        return "\n".join(lines)
@@ -0,0 +1,101 @@
+# pigpio の wave (DMA) で7セグ表示器をダイナミック制御する
+#
+# display() は Python のループで桁を切り替えて time.sleep(0.001) するので、CPUを1コア使い続け、
+# counter / task のスレッドと GIL を取り合い、Python が止まるたびに表示がちらつく。
+# ここでは表示する4桁 (1フレーム) を segments.py のマスクで pigpio の wave に変換し、
+# wave_send_repeat で pigpiod に繰り返し送らせる (タイミングは DMA が作るので Python は何もしなくてよい)。
+#   1桁 = 2パルス
+#     - すべてのセグメントとドットを消灯 + この桁のカソードをLOW (blank_us)
+#     - 前の桁のカソードをHIGH + この桁のセグメントを点灯 (on_us)
+# 表示するフレームが変わったときだけ wave を作り直し、WAVE_MODE_REPEAT_SYNC で送る
+# (今の wave の1周が終わったところで切り替わるので、途中のフレームは表示されない)。
+# 切り替わったのを wave_tx_at で確認してから前の wave を削除する。
+#
+# 実行方法
+#   ./bin/cli display-counter --wave
+import threading
+import time
+from typing import Optional, Sequence
+import pigpio
+from display.frame import FrameSlot, FrameStats
+from display.segments import SegmentBank, SegmentPins
+
+ON_US = 1000   # 1桁の点灯時間[us] (display() の sleep(0.001) と同じ)
+BLANK_US = 2   # 桁を切り替える間の消灯時間[us]
+POLL = 0.05    # 表示する値が変わったかを確認する間隔[sec]
+SWAP_TIMEOUT = 1.0  # wave が切り替わるのを待つ最大時間[sec]
+
+
+class WaveRefresher:
+    """表示するフレームを wave にして pigpiod に繰り返し送らせる"""
+
+    def __init__(self, pi, bank: SegmentBank, on_us: int = ON_US, blank_us: int = BLANK_US):
+        self.pi = pi
+        self.bank = bank
+        self.on_us = on_us
+        self.blank_us = blank_us
+        self.wave_id: Optional[int] = None
+        self.frame = None
+        self.swaps = 0
+
+    def pulses(self, data: Sequence[int]):
+        pulses = []
+        for clear, set_ in self.bank.compile(data):
+            pulses.append(pigpio.pulse(0, clear, self.blank_us))
+            pulses.append(pigpio.pulse(set_, 0, self.on_us))
+        return pulses
+
+    def show(self, data: Sequence[int]) -> bool:
+        """data を表示する (前回と同じフレームなら何もしない)。wave を作り直した場合は True"""
+        frame = tuple(data)
+        if frame == self.frame:
+            return False
+        pi = self.pi
+        pi.wave_add_new()  # 作りかけのパルスを捨てる (送信中の wave はそのまま)
+        pi.wave_add_generic(self.pulses(frame))
+        wave_id = pi.wave_create()
+        if wave_id < 0:
+            raise Exception(f"wave_create faild... ({wave_id})")
+
+        previous = self.wave_id
+        if previous is None:
+            pi.wave_send_repeat(wave_id)
+        else:
+            pi.wave_send_using_mode(wave_id, pigpio.WAVE_MODE_REPEAT_SYNC)
+            # 前の wave の1周が終わって切り替わってから削除する
+            deadline = time.monotonic() + SWAP_TIMEOUT
+            while pi.wave_tx_at() != wave_id and time.monotonic() < deadline:
+                time.sleep(self.on_us * len(frame) / 1e6 / 4)
+            pi.wave_delete(previous)
+        self.wave_id = wave_id
+        self.frame = frame
+        self.swaps += 1
+        return True
+
+    def close(self):
+        """wave を止めて削除し、すべての桁を消灯する"""
+        self.pi.wave_tx_stop()
+        if self.wave_id is not None:
+            self.pi.wave_delete(self.wave_id)
+            self.wave_id = None
+        self.frame = None
+        self.bank.off(self.pi)
+
+
+def display(pi, pins: SegmentPins, slot: FrameSlot, stats: FrameStats, stop: threading.Event = None,
+            poll: float = POLL):
+    """
+    slot のフレームが変わったとき (generation が変わったとき) だけ wave を作り直す
+    stop がセットされたら wave を止めて終了する
+    """
+    refresher = WaveRefresher(pi, SegmentBank(pins))
+    stats.refresh_hz = 1e6 / (len(pins.digits) * (refresher.on_us + refresher.blank_us))
+    stop = stop or threading.Event()
+    try:
+        while not stop.is_set():
+            frame = slot.frame
+            if stats.changed(frame):
+                refresher.show(frame.shapes)
+            stop.wait(poll)
+    finally:
+        refresher.close()
@@ -0,0 +1,151 @@
+# pigpio の呼び出しの計測
+#
+# 各ドライバー (bme280, temp_sensor, display など) は pigpio.pi() で作ったオブジェクトの
+# spi_xfer, i2c_write_device, write などを直接呼び出している。
+# install() すると pigpio.pi を計測用のラッパーを返す関数に置き換え、
+# 呼び出しの種類 (メソッド名) とハンドル (GPIO) ごとに回数・バイト数 (送信 + 受信)・レイテンシのヒストグラムを記録する。
+# ドライバーのコードは変更しなくてよい。install() しなければ何も置き換えないので、計測しないときのオーバーヘッドはない。
+#
+# 集計結果は終了時と SIGUSR1 を受け取ったときに表示する
+#   ./bin/cli --instrument bme280 --preset gaming
+#   kill -USR1 <pid>
+import atexit
+import signal
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple
+import pigpio
+
+# 1つ目の引数がハンドル (SPI, I2C, シリアル) または GPIO 番号の呼び出し
+# (それ以外の呼び出しはメソッド名だけで集計する)
+KEYED_PREFIXES = ("spi_", "i2c_", "bb_", "serial_")
+KEYED_CALLS = {"write", "read", "set_mode", "get_mode", "set_pull_up_down", "set_PWM_dutycycle", "gpio_trigger"}
+# 開く・閉じる呼び出しはハンドルごとに分けない
+UNKEYED_CALLS = {"spi_open", "i2c_open", "serial_open"}
+
+# ヒストグラムの区間 [us] (2のべき乗。最後の区間は上限なし)
+BUCKETS = [2 ** i for i in range(17)]
+
+
+class CallStats:
+    """1種類の呼び出しの回数・バイト数・レイテンシ"""
+
+    def __init__(self):
+        self.count = 0
+        self.bytes = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.histogram = [0] * (len(BUCKETS) + 1)
+
+    def add(self, latency: float, nbytes: int):
+        self.count += 1
+        self.bytes += nbytes
+        self.total += latency
+        self.max = max(self.max, latency)
+        us = latency * 1e6
+        i = 0
+        while i < len(BUCKETS) and us >= BUCKETS[i]:
+            i += 1
+        self.histogram[i] += 1
+
+    def percentile(self, p: float) -> float:
+        """ヒストグラムから求めたパーセンタイル[us] (区間の上限。最大値を超える場合は最大値)"""
+        target = self.count * p / 100
+        seen = 0
+        for i, n in enumerate(self.histogram):
+            seen += n
+            if seen >= target and n:
+                return min(BUCKETS[i], self.max * 1e6) if i < len(BUCKETS) else self.max * 1e6
+        return 0.0
+
+
+class Recorder:
+    def __init__(self):
+        # SIGUSR1 のハンドラーは記録中のメインスレッドに割り込んで summary() を呼ぶので、再入できるロックにする
+        self.lock = threading.RLock()
+        self.stats: Dict[Tuple[str, object], CallStats] = OrderedDict()
+        self.started = time.monotonic()
+
+    def record(self, name: str, key, latency: float, nbytes: int):
+        with self.lock:
+            stats = self.stats.get((name, key))
+            if stats is None:
+                stats = self.stats[(name, key)] = CallStats()
+            stats.add(latency, nbytes)
+
+    def summary(self) -> str:
+        with self.lock:
+            items = sorted(self.stats.items(), key=lambda item: -item[1].total)
+            elapsed = time.monotonic() - self.started
+        lines = [f"[INSTRUMENT] pigpio calls (elapsed {elapsed:.1f}s)",
+                 f"{'call':<28} {'handle':>6} {'count':>8} {'bytes':>9} {'total[ms]':>10} "
+                 f"{'mean[us]':>9} {'p50[us]':>8} {'p99[us]':>8} {'max[us]':>8}"]
+        for (name, key), s in items:
+            lines.append(f"{name:<28} {'-' if key is None else key:>6} {s.count:>8} {s.bytes:>9} {s.total * 1e3:>10.1f} "
+                         f"{s.total / s.count * 1e6:>9.1f} {s.percentile(50):>8.0f} {s.percentile(99):>8.0f} {s.max * 1e6:>8.0f}")
+            # ヒストグラム: 区間の上限[us]:回数
+            bins = [f"<{BUCKETS[i] if i < len(BUCKETS) else 'inf'}:{n}" for i, n in enumerate(s.histogram) if n]
+            lines.append(f"{'':<28} {' '.join(bins)}")
+        return "\n".join(lines)
+
+
+def payload_size(value) -> int:
+    """引数・戻り値に含まれるバイト列の長さ"""
+    if isinstance(value, (bytes, bytearray, list)):
+        return len(value)
+    if isinstance(value, tuple):
+        return sum(payload_size(v) for v in value)
+    return 0
+
+
+class InstrumentedPi:
+    """pigpio.pi のラッパー。呼び出したメソッドを計測する関数に置き換えてキャッシュする"""
+
+    def __init__(self, pi, recorder: Recorder):
+        self._pi = pi
+        self._recorder = recorder
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._pi, name)
+        if name.startswith("_") or not callable(attr):
+            return attr
+        keyed = name not in UNKEYED_CALLS and (name.startswith(KEYED_PREFIXES) or name in KEYED_CALLS)
+        record = self._recorder.record
+
+        def call(*args, **kwargs):
+            start = time.perf_counter()
+            result = attr(*args, **kwargs)
+            latency = time.perf_counter() - start
+            nbytes = sum(payload_size(a) for a in args) + payload_size(result)
+            record(name, args[0] if keyed and args else None, latency, nbytes)
+            return result
+
+        # 2回目以降は __getattr__ を通らないようにする
+        setattr(self, name, call)
+        return call
+
+
+_recorder = None
+
+
+def install(out=sys.stderr) -> Recorder:
+    """pigpio.pi を置き換えて計測を開始する。終了時と SIGUSR1 で集計を表示する"""
+    global _recorder
+    if _recorder is not None:
+        return _recorder
+    recorder = _recorder = Recorder()
+    original = pigpio.pi
+
+    def instrumented_pi(*args, **kwargs):
+        return InstrumentedPi(original(*args, **kwargs), recorder)
+
+    pigpio.pi = instrumented_pi
+
+    def dump(*_):
+        print(recorder.summary(), file=out, flush=True)
+
+    atexit.register(dump)
+    signal.signal(signal.SIGUSR1, dump)
+    return recorder
@@ -1,5 +1,5 @@
 import click
-
+from bme280.presets import PRESETS
 
 
 CONTEXT_SETTINGS = {
@@ -9,10 +9,14 @@ CONTEXT_SETTINGS = {
 # click.group: https://click.palletsprojects.com/en/8.1.x/commands/
 @click.group(context_settings=CONTEXT_SETTINGS)
 @click.option("-d", "--debug", default=False, is_flag=True)
+@click.option("--instrument", default=False, is_flag=True, help="pigpioの呼び出しを計測し、終了時とSIGUSR1で集計を表示する")
 @click.pass_context
-def cli(context, debug):
+def cli(context, debug, instrument):
     context.ensure_object(dict)
     context.obj["debug"] = debug
+    if instrument:
+        from instrument import pigpio_calls
+        pigpio_calls.install()
 
 #@cli.command()
 #@click.argument("user_name", type=str)
@@ -25,37 +29,292 @@ def cli(context, debug):
 @click.pass_context
 @click.option("-cs", "--chip-select", default=0, type=int, help="ラズパイの CE0(0), CE1(1)どちらに接続するか")
 @click.option("-ch", "--channel", default=0, type=int, help="MCP3002のCH0端子(0),CH1端子(1)どちらを利用するか")
-def temp_wiringpi(context, chip_select, channel):
+@click.option("-P", "--probe", default=None, help="プローブ名 (temp-calibrate で保存したキャリブレーションを使う)")
+def temp_wiringpi(context, chip_select, channel, probe):
     from temp_sensor import temp_wiringpi
     temp_wiringpi.main(
         debug=context.obj["debug"],
         chip_select=chip_select,
         channel=channel,
+        probe=probe,
     )
 
 @cli.command()
 @click.pass_context
 @click.option("-cs", "--chip-select", default=0, type=int, help="ラズパイの CE0端子(0), CE1端子(1)どちらに接続するか")
 @click.option("-ch", "--channel", default=0, type=int, help="MCP3002のCH0端子(0),CH1端子(1)どちらを利用するか")
-def temp_pigpio(context, chip_select, channel):
+@click.option("-P", "--probe", default=None, help="プローブ名 (temp-calibrate で保存したキャリブレーションを使う)")
+def temp_pigpio(context, chip_select, channel, probe):
     from temp_sensor import temp_pigpio
     temp_pigpio.main(
         debug=context.obj["debug"],
         chip_select=chip_select,
         channel=channel,
+        probe=probe,
+    )
+
+@cli.command()
+@click.pass_context
+@click.option("-cs", "--chip-select", default=0, type=int, help="ラズパイの CE0端子(0), CE1端子(1)どちらに接続するか")
+@click.option("-ch", "--channel", default=0, type=int, help="MCP3002のCH0端子(0),CH1端子(1)どちらを利用するか")
+@click.option("-b", "--burst", default=100, type=click.IntRange(1), help="1回の表示で変換する回数 (まとめて ioctl で転送する)")
+@click.option("--fake", default=False, is_flag=True, help="/dev/spidev の代わりにMCP3002を真似するダミーを使う")
+@click.option("-P", "--probe", default=None, help="プローブ名 (temp-calibrate で保存したキャリブレーションを使う)")
+def temp_spidev(context, chip_select, channel, burst, fake, probe):
+    from temp_sensor import temp_spidev
+    temp_spidev.main(
+        debug=context.obj["debug"],
+        chip_select=chip_select,
+        channel=channel,
+        burst=burst,
+        fake=fake,
+        probe=probe,
+    )
+
+@cli.command()
+@click.pass_context
+@click.option("-cs", "--chip-select", default=0, type=int, help="ラズパイの CE0端子(0), CE1端子(1)どちらに接続するか")
+@click.option("-ch", "--channel", default=0, type=int, help="MCP3002のCH0端子(0),CH1端子(1)どちらを利用するか")
+@click.option("-i", "--interval", "interval_us", default=1000, type=click.IntRange(1, 1000000), help="サンプリング間隔[us]")
+@click.option("-b", "--batches", default=50, type=click.IntRange(1), help="実行するバッチの数 (1バッチ = 21サンプル)")
+@click.option("-P", "--probe", default=None, help="プローブ名 (temp-calibrate で保存したキャリブレーションを使う)")
+def temp_pigpio_script(context, chip_select, channel, interval_us, batches, probe):
+    from temp_sensor import temp_script
+    temp_script.main(
+        debug=context.obj["debug"],
+        chip_select=chip_select,
+        channel=channel,
+        interval_us=interval_us,
+        batches=batches,
+        probe=probe,
+    )
+
+@cli.command()
+@click.pass_context
+@click.option("-cs", "--chip-select", default=0, type=int, help="ラズパイの CE0端子(0), CE1端子(1)どちらに接続するか")
+@click.option("--chip", "chip_name", default="mcp3002", type=click.Choice(["mcp3002", "mcp3004", "mcp3008"]), help="A/Dコンバータの種類")
+@click.option("-ch", "--channel", "channels", multiple=True, default=["0"], help="読み込むチャンネル。\"2:10\" のようにレート[Hz]も指定できる。複数指定可")
+@click.option("-i", "--interval", default=1.0, type=float, help="レートを指定しないチャンネルを読み込む間隔[sec]")
+@click.option("-t", "--duration", default=None, type=float, help="読み込む時間[sec] (省略時は無制限)")
+@click.option("--backend", default="spidev", type=click.Choice(["spidev", "pigpio"]), help="SPIの転送方法")
+@click.option("--fake", default=False, is_flag=True, help="実機の代わりにA/Dコンバータを真似するダミーを使う")
+@click.option("-P", "--probe", "probes", multiple=True, help="チャンネルごとのプローブ名 (\"0=lm61\" のように指定)。複数指定可")
+def temp_scan(context, chip_select, chip_name, channels, interval, duration, backend, fake, probes):
+    from temp_sensor import scan
+    scan.main(
+        debug=context.obj["debug"],
+        chip_select=chip_select,
+        chip_name=chip_name,
+        channels=list(channels),
+        interval=interval,
+        duration=duration,
+        backend=backend,
+        fake=fake,
+        probes=list(probes),
+    )
+
+@cli.command()
+@click.pass_context
+@click.option("-cs", "--chip-select", default=0, type=int, help="ラズパイの CE0端子(0), CE1端子(1)どちらに接続するか")
+@click.option("-ch", "--channel", default=0, type=int, help="MCP3002のCH0端子(0),CH1端子(1)どちらを利用するか")
+@click.option("--clock", default=500000, type=int, help="SPIクロック[Hz]")
+@click.option("-f", "--factor", default=256, type=click.IntRange(1), help="間引く数 (factor 回の変換で1回表示)")
+@click.option("--order", default=2, type=click.IntRange(1), help="CICフィルターの次数 (1: 単純平均)")
+@click.option("--fake", default=False, is_flag=True, help="/dev/spidev の代わりにMCP3002を真似するダミーを使う")
+@click.option("-P", "--probe", default=None, help="プローブ名 (temp-calibrate で保存したキャリブレーションを使う)")
+def temp_oversample(context, chip_select, channel, clock, factor, order, fake, probe):
+    from temp_sensor import oversample
+    oversample.main(
+        debug=context.obj["debug"],
+        chip_select=chip_select,
+        channel=channel,
+        clock=clock,
+        factor=factor,
+        order=order,
+        fake=fake,
+        probe=probe,
+    )
+
+@cli.command()
+@click.pass_context
+@click.option("-cs", "--chip-select", default=0, type=int, help="ラズパイの CE0端子(0), CE1端子(1)どちらに接続するか")
+@click.option("--clock", "clocks", multiple=True, type=int, default=[50000, 100000, 250000, 500000, 1000000], help="計測するSPIクロック[Hz]。複数指定可")
+@click.option("-n", "--num", default=2000, type=click.IntRange(1), help="クロックごとの変換回数")
+@click.option("--fake", default=False, is_flag=True, help="/dev/spidev の代わりにMCP3002を真似するダミーを使う")
+def temp_bench_clock(context, chip_select, clocks, num, fake):
+    from temp_sensor import oversample
+    oversample.bench(
+        chip_select=chip_select,
+        clocks=list(clocks),
+        n=num,
+        fake=fake,
     )
 
 @cli.command()
 @click.pass_context
-def display_counter(context):
+@click.argument("name", type=str)
+@click.option("--point", "points", multiple=True, help="校正点 \"値:温度\" (例: 262:25.0)。2点以上なら折れ線で補正。複数指定可")
+@click.option("--gain", default=None, type=float, help="公称の式の温度に掛ける値")
+@click.option("--offset", default=None, type=float, help="公称の式の温度に足す値[DegC]")
+@click.option("--vref", default=None, type=float, help="A/Dコンバータの基準電圧[V]")
+def temp_calibrate(context, name, points, gain, offset, vref):
+    from temp_sensor import calibration
+    calibration.main(
+        name=name,
+        points=list(points),
+        gain=gain,
+        offset=offset,
+        vref=vref,
+    )
+
+@cli.command()
+@click.pass_context
+@click.option("-cs", "--chip-select", default=0, type=int, help="ラズパイの CE0端子(0), CE1端子(1)どちらに接続するか")
+@click.option("-p", "--preset", default="indoor-navigation", type=click.Choice(list(PRESETS.keys())), help="動作モードのプリセット (データシート 3.5)")
+@click.option("-i", "--interval", default=None, type=float, help="表示間隔[sec] (省略時はフォースドモードならプリセットの測定間隔、ノーマルモードなら1秒。0ならデータが揃い次第表示)")
+@click.option("--cache/--no-cache", default=True, help="キャリブレーションデータと設定をキャッシュして、再起動時の初期化を省略する")
+@click.option("--profile", "profile_path", default=None, type=click.Path(dir_okay=False), help="キャッシュの保存先 (省略時は ~/.cache/iot-work/bme280_profiles.json)")
+def bme280(context, chip_select, preset, interval, cache, profile_path):
+    from bme280 import bme280
+    from bme280.profile import DEFAULT_PROFILE_PATH
+    bme280.run(
+        chip_select=chip_select,
+        preset_name=preset,
+        interval=interval,
+        profile_path=(profile_path or DEFAULT_PROFILE_PATH) if cache else None,
+    )
+
+@cli.command()
+@click.pass_context
+@click.option("-D", "--device", "devices", multiple=True, default=["spi:0"], help="接続先 (spi:0, spi:1, i2c:0x76, i2c:0x77)。複数指定可")
+@click.option("-p", "--preset", default="indoor-navigation", type=click.Choice(list(PRESETS.keys())), help="動作モードのプリセット (データシート 3.5)")
+@click.option("-i", "--interval", default=None, type=float, help="フォースドモードの測定間隔[sec] (省略時はプリセットの測定間隔)")
+@click.option("-t", "--duration", default=None, type=float, help="測定する時間[sec] (省略時は無制限)")
+@click.option("--stats-interval", default=10, type=float, help="統計情報を表示する間隔[sec]")
+@click.option("--cache/--no-cache", default=True, help="キャリブレーションデータと設定をキャッシュして、再起動時の初期化を省略する")
+@click.option("--profile", "profile_path", default=None, type=click.Path(dir_okay=False), help="キャッシュの保存先 (省略時は ~/.cache/iot-work/bme280_profiles.json)")
+def bme280_multi(context, devices, preset, interval, duration, stats_interval, cache, profile_path):
+    from bme280 import poller
+    from bme280.profile import DEFAULT_PROFILE_PATH
+    poller.run(
+        devices=list(devices),
+        preset_name=preset,
+        interval=interval,
+        duration=duration,
+        stats_interval=stats_interval,
+        profile_path=(profile_path or DEFAULT_PROFILE_PATH) if cache else None,
+    )
+
+@cli.command()
+@click.pass_context
+@click.option("-D", "--device", "devices", multiple=True, default=["spi:0", "i2c:0x76"], help="接続先 (spi:0, spi:1, i2c:0x76, i2c:0x77)。複数指定可")
+@click.option("-n", "--num", default=1000, type=int, help="読み込み回数")
+def bme280_bench_bus(context, devices, num):
+    from bme280 import bus_benchmark
+    bus_benchmark.run(
+        devices=list(devices),
+        n=num,
+    )
+
+@cli.command()
+@click.pass_context
+@click.option("--wave", default=False, is_flag=True, help="pigpioのwave (DMA) で表示する (表示する値が変わったときだけPythonが動く)")
+@click.option("--timing", default="sleep", type=click.Choice(["sleep", "deadline"]), help="桁を切り替える間隔の決め方 (sleep: 切り替えのあとに1ms sleep, deadline: 1msごとの締め切りまで待つ)")
+@click.option("--stats", "show_stats", default=False, is_flag=True, help="終了時に桁ごとの点灯時間・フレーム周期・ジッターのパーセンタイルを表示する")
+def display_counter(context, wave, timing, show_stats):
     from display import counter
-    counter.main()
+    counter.main(
+        wave=wave,
+        timing=timing,
+        show_stats=show_stats,
+    )
 
 @cli.command()
 @click.pass_context
-def display_temp_sensor(context):
+@click.option("--wave", default=False, is_flag=True, help="pigpioのwave (DMA) で表示する (表示する値が変わったときだけPythonが動く)")
+@click.option("--timing", default="sleep", type=click.Choice(["sleep", "deadline"]), help="桁を切り替える間隔の決め方 (sleep: 切り替えのあとに1ms sleep, deadline: 1msごとの締め切りまで待つ)")
+@click.option("--stats", "show_stats", default=False, is_flag=True, help="終了時に桁ごとの点灯時間・フレーム周期・ジッターのパーセンタイルを表示する")
+def display_temp_sensor(context, wave, timing, show_stats):
     from display import temp_sensor
-    temp_sensor.main()
+    temp_sensor.main(
+        wave=wave,
+        timing=timing,
+        show_stats=show_stats,
+    )
+
+@cli.command()
+@click.pass_context
+@click.option("--digits", default=8, type=click.IntRange(1), help="桁数 (74HC595 は セグメント用1個 + 8桁ごとに1個)")
+@click.option("--backend", default="spidev", type=click.Choice(["spidev", "pigpio"]), help="spidev: 1フレーム1回のioctl, pigpio: 1桁ごとにspi_write")
+@click.option("-cs", "--chip-select", default=0, type=int, help="ラズパイの CE0(0), CE1(1)どちらに接続するか (74HC595のRCLK)")
+@click.option("--clock", default=1000000, type=int, help="SPIのクロック[Hz]")
+@click.option("--on-us", default=1000, type=click.IntRange(0, 65535), help="1桁の点灯時間[us] (65535まで)")
+@click.option("--digit-active-high", default=False, is_flag=True, help="桁の選択をHIGHで点灯する (トランジスターアレイを挟む場合)")
+@click.option("--fake", default=False, is_flag=True, help="SPIの代わりに FakeShiftRegister を使う (実機なしで動作確認)")
+def display_shift_register(context, digits, backend, chip_select, clock, on_us, digit_active_high, fake):
+    from display import shift_register
+    shift_register.main(
+        digits=digits,
+        backend=backend,
+        chip_select=chip_select,
+        clock=clock,
+        on_us=on_us,
+        digit_active_low=not digit_active_high,
+        fake=fake,
+    )
+
+@cli.command()
+@click.pass_context
+@click.option("--digits", "digit_counts", multiple=True, default=[4, 8, 16, 32], type=click.IntRange(1), help="桁数。複数指定可")
+@click.option("--backend", default="spidev", type=click.Choice(["spidev", "pigpio"]), help="spidev: 1フレーム1回のioctl, pigpio: 1桁ごとにspi_write")
+@click.option("-cs", "--chip-select", default=0, type=int, help="ラズパイの CE0(0), CE1(1)どちらに接続するか (74HC595のRCLK)")
+@click.option("--clock", default=1000000, type=int, help="SPIのクロック[Hz]")
+@click.option("--on-us", default=0, type=click.IntRange(0, 65535), help="1桁の点灯時間[us] (0: 転送だけの速さ)")
+@click.option("-n", "--frames", default=200, type=click.IntRange(1), help="送るフレームの数")
+@click.option("--fake", default=False, is_flag=True, help="SPIの代わりに FakeShiftRegister を使う (実機なしで動作確認)")
+def display_bench_shift_register(context, digit_counts, backend, chip_select, clock, on_us, frames, fake):
+    from display import shift_register
+    shift_register.bench(
+        digit_counts=list(digit_counts),
+        backend=backend,
+        chip_select=chip_select,
+        clock=clock,
+        on_us=on_us,
+        frames=frames,
+        fake=fake,
+    )
+
+@cli.command()
+@click.pass_context
+@click.option("-n", "--frames", default=200, type=click.IntRange(1), help="4桁を表示する回数")
+@click.option("--on-time", default=0.001, type=float, help="1桁の点灯時間[sec] (sleep する時間)")
+def display_bench(context, frames, on_time):
+    from display import segments
+    segments.run(frames=frames, on_time=on_time)
+
+@cli.command()
+@click.pass_context
+@click.option("-n", "--frames", default=20, type=click.IntRange(1), help="書き換える画面の数")
+def oled_bench(context, frames):
+    from so1602 import benchmark
+    benchmark.run(frames=frames)
+
+@cli.command()
+@click.pass_context
+@click.argument("text", type=str)
+@click.option("-l", "--line", default=1, type=click.IntRange(0, 1), help="スクロールする行 (0: 1行目, 1: 2行目)")
+@click.option("-r", "--rate", default=10.0, type=click.FloatRange(min=0, min_open=True), help="1秒あたりにスクロールする文字数")
+@click.option("-t", "--duration", default=None, type=float, help="スクロールする時間[sec] (指定しなければ止めるまで)")
+@click.option("--ring", default=20, type=click.IntRange(17, 32), help="1行のDDRAMの文字数 (ディスプレイシフトで一周する文字数)")
+def oled_scroll(context, text, line, rate, duration, ring):
+    from so1602 import scroller
+    scroller.run(
+        text=text,
+        line=line,
+        rate=rate,
+        duration=duration,
+        ring=ring,
+    )
 
 if __name__ == "__main__":
     cli()
@@ -0,0 +1,93 @@
+# SO1602 の1画面 (2行 x 20文字) の書き換えの速さを比べるベンチマーク (実機が必要)
+#
+# 実行方法
+#   ./bin/cli oled-bench -n 20
+#
+#   - init    : 初期化 (init) にかかる時間
+#   - per-byte: Set DDRAM Address (write_command) + 1文字ずつ write_data (今までの書き込み方)
+#   - stream  : write_line (アドレスの設定と Co=0 のデータストリームを1行1回の I2C 転送で書き込む)
+#   - line-shift: 2行目だけディスプレイシフトする設定 (disp4.py)。
+#                 1コマンドずつ write_command するか、Controller で不要な切り替えを省いて1回の転送にまとめるか
+import time
+from typing import Callable
+import pigpio
+from so1602.controller import Controller
+from so1602.so1602 import LINE_ADDRESS, LINE_WIDTH, write_data, write_command, write_line, init, off, open_oled
+
+
+def frame_text(n: int):
+    """フレームごとに内容が変わる2行"""
+    return [f"frame {n:>6}".ljust(LINE_WIDTH).encode(), f"{time.monotonic():.3f}".ljust(LINE_WIDTH).encode()]
+
+
+def per_byte(pi, i2c_handler, lines):
+    for line, text in enumerate(lines):
+        write_command(pi, i2c_handler, 0b10000000 | LINE_ADDRESS[line])  # Set DDRAM RAM Address
+        for char in text:
+            write_data(pi, i2c_handler, char)
+
+
+def stream(pi, i2c_handler, lines):
+    for line, text in enumerate(lines):
+        write_line(pi, i2c_handler, line, text)
+
+
+def bench(name: str, func: Callable, pi, i2c_handler, frames: int):
+    start = time.perf_counter()
+    for n in range(frames):
+        func(pi, i2c_handler, frame_text(n))
+    elapsed = time.perf_counter() - start
+    print(f"{name:<10}: {frames / elapsed:8.2f} fps ({elapsed / frames * 1000:.2f} ms/frame)")
+
+
+# disp4.py の2行目だけディスプレイシフトする設定と元に戻す設定
+LINE_SHIFT_COMMANDS = [
+    0b00101010, 0b00011101, 0b00101001, 0b00101010, 0b00010010, 0b00101000,
+    0b00101010, 0b00011101, 0b00101001, 0b00101010, 0b00011111, 0b00101000,
+]
+
+
+def line_shift_commands(pi, i2c_handler):
+    for command in LINE_SHIFT_COMMANDS:
+        write_command(pi, i2c_handler, command)
+
+
+def line_shift_controller(pi, i2c_handler):
+    controller = Controller(pi, i2c_handler)
+    controller.enable_line_shift(0b0010)
+    controller.enable_line_shift(0b1111)
+    return controller
+
+
+def main(pi, i2c_handler, frames: int = 20):
+    start = time.perf_counter()
+    init(pi, i2c_handler)
+    print(f"{'init':<10}: {(time.perf_counter() - start) * 1000:8.2f} ms")
+
+    start = time.perf_counter()
+    line_shift_commands(pi, i2c_handler)
+    print(f"{'line-shift':<10}: {(time.perf_counter() - start) * 1000:8.2f} ms "
+          f"(commands: {len(LINE_SHIFT_COMMANDS)}, transactions: {len(LINE_SHIFT_COMMANDS)})")
+    start = time.perf_counter()
+    controller = line_shift_controller(pi, i2c_handler)
+    print(f"{'controller':<10}: {(time.perf_counter() - start) * 1000:8.2f} ms "
+          f"(commands: {controller.commands}, transactions: {controller.transactions})")
+    bench("per-byte", per_byte, pi, i2c_handler, frames)
+    bench("stream", stream, pi, i2c_handler, frames)
+
+
+def run(frames: int = 20):
+    pi = pigpio.pi()
+    if not pi.connected:
+        raise Exception("pigpio connection faild...")
+    i2c_handler = open_oled(pi)
+    try:
+        main(pi, i2c_handler, frames)
+    finally:
+        off(pi, i2c_handler)
+        pi.i2c_close(i2c_handler)
+        pi.stop()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,282 @@
+# US2066 の拡張命令セット (IS/RE/SD) の状態を追跡するコマンド層
+#
+# US2066 の命令の多くは IS, RE, SD の組み合わせごとに別の意味になるので、
+# so1602awwb-uc-wb/disp4.py では Function Set (RE, IS) と OLED Characterization (SD) を毎回手で切り替えている。
+#   0b00101010 (RE=1) -> 0b00011101 -> 0b00101001 (IS=1, RE=0) -> 0b00101010 (RE=1) -> 0b00010010 -> 0b00101000
+# Controller は現在の IS, RE, SD (と Function Set で一緒に送る N, DH, BE, REV) を覚えておき、
+#   - 命令ごとに必要な状態を知っていて、足りない切り替えだけを送る (同じ状態への切り替えは送らない)
+#   - 続けて送るコマンドは Co=1 のコントロールバイトでつないで1回の I2C 転送にまとめる
+#     [0x80, cmd1, 0x80, cmd2, ..., 0x00, cmdN]
+#   - 実行に時間がかかる Clear Display / Return Home を送ったときと flush() したときだけ完了を待つ
+#
+# 状態の遷移 (データシートの命令表より)
+#   - IS を変えられるのは RE=0 の Function Set (0 0 1 N DH RE(0) IS) だけ
+#   - RE は Function Set の RE ビット (RE=1 の形は 0 0 1 N BE RE(1) REV)
+#   - SD を変えられるのは RE=1 の OLED Characterization (0 1 1 1 1 0 0 SD) だけ
+#   - SD=1 の間は Function Set を受け付けないので、先に SD=0 に戻す
+from typing import List, Optional, Union
+from so1602.so1602 import (
+    CONTROL_COMMAND, CONTROL_COMMAND_CONTINUE, CONTROL_DATA, DEFAULT_COMMAND_TIME, LINE_ADDRESS,
+    command_time, wait_ready,
+)
+
+OLED_CHARACTERIZATION = 0b01111000  # | SD
+# SD=1 (OLEDコマンドセット) の2バイトコマンド (2バイト目は設定値)
+#   Set Contrast Control, Set Display Clock, Set Phase Length, Set SEG Pins, Set VCOMH, Function Selection C
+SD_TWO_BYTE_COMMANDS = {0b10000001, 0b11010101, 0b11011001, 0b11011010, 0b11011011, 0b11011100}
+# RE=1, SD=0 の2バイトコマンド (Function Selection A, Function Selection B)
+RE_TWO_BYTE_COMMANDS = {0b01110001, 0b01110010}
+
+
+class Controller:
+    """
+    IS/RE/SD の状態を追跡してコマンドを送る
+
+    作った時点では電源投入直後の状態 (IS=0, RE=0, SD=0) とみなす。
+    他の処理がモードを切り替えたかもしれない場合は sync() で状態を確定させる。
+    """
+
+    def __init__(self, pi, i2c_handler, lines: int = 2):
+        self.pi = pi
+        self.i2c_handler = i2c_handler
+        self.is_ = 0
+        self.re = 0
+        self.sd = 0
+        self.n = 1 if lines >= 2 else 0  # 表示行数 (N)
+        self.dh = 0   # 2行高フォント (DH, RE=0 の Function Set)
+        self.be = 0   # CGRAMのブリンク (BE, RE=1 の Function Set)
+        self.rev = 0  # 表示反転 (REV, RE=1 の Function Set)
+        self._queue: List[int] = []
+        self._wait = 0.0
+        self._param = False  # write_command で2バイトコマンドの2バイト目を待っている
+        # 統計 (送ったコマンドのバイト数, そのうちのモード切り替え, 送らずに済んだモード切り替え, I2C転送の回数)
+        self.commands = 0
+        self.transitions = 0
+        self.elided = 0
+        self.transactions = 0
+
+    # --- 送信 ---
+
+    def _emit(self, *commands: int):
+        self._queue.extend(commands)
+        self.commands += len(commands)
+
+    def _function_set(self, re: int):
+        if re:
+            command = 0b00100010 | self.n << 3 | self.be << 2 | self.rev
+        else:
+            command = 0b00100000 | self.n << 3 | self.dh << 2 | self.is_
+        self.re = re
+        self._emit(command)
+        self.transitions += 1
+
+    def _characterization(self, sd: int):
+        self.sd = sd
+        self._emit(OLED_CHARACTERIZATION | sd)
+        self.transitions += 1
+
+    def _enter(self, is_: Optional[int] = None, re: Optional[int] = None, sd: Optional[int] = None):
+        """命令に必要な状態にする (None はどちらでもよい)。今の状態のままでよければ何も送らない"""
+        if self.sd and (sd == 0 or re == 0 or (is_ is not None and is_ != self.is_)):
+            self._characterization(0)
+        if is_ is not None and is_ != self.is_:
+            self.is_ = is_
+            self._function_set(0)
+        if re is not None and re != self.re:
+            self._function_set(re)
+        if sd and not self.sd:
+            if not self.re:
+                self._function_set(1)
+            self._characterization(1)
+
+    def _packet(self) -> bytearray:
+        packet = bytearray()
+        for command in self._queue:
+            packet += bytes([CONTROL_COMMAND_CONTINUE, command])
+        return packet
+
+    def flush(self):
+        """たまっているコマンドを1回の I2C 転送で送って完了を待つ"""
+        if not self._queue:
+            return
+        packet = self._packet()
+        packet[-2] = CONTROL_COMMAND  # 最後のコマンドのあとにはコントロールバイトが続かない
+        self.pi.i2c_write_device(self.i2c_handler, bytes(packet))
+        self.transactions += 1
+        self._queue.clear()
+        wait_ready(self.pi, self.i2c_handler, self._wait)
+        self._wait = 0.0
+
+    def command(self, *commands: int, is_: Optional[int] = None, re: Optional[int] = None,
+                sd: Optional[int] = None):
+        """
+        is_, re, sd の状態で実行するコマンド (2バイトコマンドは2バイトとも) を送る
+        Clear Display / Return Home はすぐに送って完了を待ち、それ以外は flush() までためておく
+        """
+        self._enter(is_, re, sd)
+        self._emit(*commands)
+        wait = command_time(commands[0])
+        self._wait = max(self._wait, wait)
+        if wait > DEFAULT_COMMAND_TIME:
+            self.flush()
+
+    def _write_data(self, data: Union[bytes, bytearray]):
+        """たまっているコマンドのあとに data のデータストリームをつなげて1回の I2C 転送で送る"""
+        packet = self._packet() + bytes([CONTROL_DATA]) + bytes(data)
+        self.pi.i2c_write_device(self.i2c_handler, bytes(packet))
+        self.transactions += 1
+        self._queue.clear()
+        self._wait = 0.0
+
+    def write(self, line: int, data: Union[bytes, bytearray], column: int = 0):
+        """
+        line 行目の column 文字目から data を書き込む
+        必要なモードの切り替え・たまっているコマンド・Set DDRAM Address・データストリームを1回の I2C 転送にまとめる
+        """
+        self._enter(re=0, sd=0)
+        self._emit(0b10000000 | LINE_ADDRESS[line] + column)
+        self._write_data(data)
+
+    def write_cgram(self, code: int, rows: Union[bytes, bytearray]):
+        """
+        CGRAM の文字コード code (0 ~ 7) に5x8ドットの文字 (上の行から8バイト。各行の下位5bit) を書き込む
+        Set CGRAM Address とデータストリームを1回の I2C 転送にまとめる
+        (このあとのデータは CGRAM に書き込まれるので、DDRAM に書き込む前に Set DDRAM Address する)
+        """
+        self.set_cgram_address(code << 3)
+        self._write_data(rows)
+
+    def write_command(self, command: int):
+        """
+        so1602.write_command と同じ1バイトのコマンド (手で書いたコマンド列をそのまま移すため)
+
+        Function Set / OLED Characterization は状態を更新し、状態が変わらなければ送らない。
+        それ以外は今の状態のままためておく。
+        """
+        if self._param:
+            self._param = False
+            self._emit(command)
+            return
+        if not self.sd and command & 0b11100000 == 0b00100000:  # Function Set
+            re = command >> 1 & 1
+            state = (command >> 3 & 1, command >> 2 & 1, command & 1)
+            current = (self.n, self.be, self.rev) if re else (self.n, self.dh, self.is_)
+            if re == self.re and state == current:
+                self.elided += 1
+                return
+            if re:
+                self.n, self.be, self.rev = state
+            else:
+                self.n, self.dh, self.is_ = state
+            self._function_set(re)
+            return
+        if self.re and command & 0b11111110 == OLED_CHARACTERIZATION:
+            sd = command & 1
+            if sd == self.sd:
+                self.elided += 1
+                return
+            self._characterization(sd)
+            return
+        self._param = command in (SD_TWO_BYTE_COMMANDS if self.sd else RE_TWO_BYTE_COMMANDS if self.re else ())
+        self.command(command)
+
+    def sync(self):
+        """
+        状態がわからない場合に IS=0, RE=0, SD=0 にする
+          - OLED Characterization (SD=0): SD=1 なら SD=0 に戻る (RE=0 のときは Set CGRAM Address になるだけで影響はない)
+          - Function Set (RE=0, IS=0)
+        """
+        self._param = False
+        self.sd = 0
+        self._characterization(0)
+        self.is_ = 0
+        self._function_set(0)
+
+    def idle(self):
+        """通常の状態 (IS=0, RE=0, SD=0) に戻す (write_line などこの層を通さずに書き込む前に呼んで flush() する)"""
+        self._enter(is_=0, re=0, sd=0)
+
+    # --- 命令 ---
+
+    def clear_display(self):
+        self.command(0b00000001, sd=0)
+
+    def return_home(self):
+        self.command(0b00000010, re=0, sd=0)
+
+    def entry_mode(self, increment: bool = True, shift: bool = False):
+        """Entry Mode Set: I/D (カーソルの移動方向), S (ディスプレイ全体のシフト)"""
+        self.command(0b00000100 | increment << 1 | shift, re=0, sd=0)
+
+    def display_control(self, display: bool = True, cursor: bool = False, blink: bool = False):
+        """Display ON/OFF Control"""
+        self.command(0b00001000 | display << 2 | cursor << 1 | blink, re=0, sd=0)
+
+    def cursor_shift(self, display: bool = True, right: bool = False):
+        """Cursor or Display Shift: S/C (1: ディスプレイ, 0: カーソル), R/L (1: 右, 0: 左)"""
+        self.command(0b00010000 | display << 3 | right << 2, is_=0, re=0, sd=0)
+
+    def double_height(self, ud: int = 0b11, dot_shift: bool = False):
+        """Double Height/Display-dot shift: UD2, UD1, DH' (1: 選択した行だけディスプレイシフト)"""
+        self.command(0b00010000 | ud << 2 | dot_shift, is_=0, re=1, sd=0)
+
+    def shift_enable(self, lines: int):
+        """Shift/Scroll Enable: DS4 ~ DS1 (ディスプレイシフトする行のビットマスク。bit0 が1行目)"""
+        self.command(0b00010000 | lines & 0b1111, is_=1, re=1, sd=0)
+
+    def scroll_quantity(self, dots: int):
+        """Set Scroll Quantity: 水平スクロールのドット数 (0 ~ 48)"""
+        self.command(0b10000000 | dots & 0b111111, is_=1, re=1, sd=0)
+
+    def set_cgram_address(self, address: int):
+        self.command(0b01000000 | address & 0b111111, is_=0, re=0, sd=0)
+
+    def set_ddram_address(self, address: int):
+        self.command(0b10000000 | address & 0b1111111, re=0, sd=0)
+
+    def contrast(self, value: int):
+        """Set Contrast Control (2バイトコマンド)"""
+        self.command(0b10000001, value & 0xFF, sd=1)
+
+    def function_set(self, dh: Optional[int] = None, rev: Optional[int] = None):
+        """DH (2行高フォント), REV (表示反転) を変える (変わらなければ送らない)"""
+        if dh is not None and dh != self.dh:
+            self.dh = dh
+            self._enter(sd=0)
+            self._function_set(0)
+        if rev is not None and rev != self.rev:
+            self.rev = rev
+            self._enter(sd=0)
+            self._function_set(1)
+
+    def enable_line_shift(self, lines: int):
+        """
+        lines (ビットマスク) の行だけディスプレイシフトするようにする (disp4.py の設定)
+        lines=0b1111 ですべての行がシフトする (既定の設定) に戻る
+        """
+        self.double_height(dot_shift=True)
+        self.shift_enable(lines)
+        self.idle()
+        self.flush()
+
+    # --- 初期化・終了処理 ---
+
+    def init(self, contrast: int = 0xFF):
+        """so1602.init と同じ初期化処理 (10回の転送が3回になる)"""
+        self.sync()
+        self.clear_display()
+        self.return_home()
+        self.display_control(True, False, False)
+        self.entry_mode(True, False)
+        self.contrast(contrast)
+        self.idle()
+        self.flush()
+
+    def off(self):
+        """so1602.off と同じ終了処理"""
+        self.sync()
+        self.clear_display()
+        self.return_home()
+        self.display_control(False, False, False)
+        self.flush()
+
@@ -0,0 +1,69 @@
+# SO1602 のフレームバッファ (差分だけ書き込む)
+#
+# 画面に表示中の内容 (shadow) と次に表示する内容 (buffer) を持ち、flush() で変わった文字の範囲 (run) だけを書き込む。
+#   - 1つの run は write_line で1回の I2C 転送 (コントロールバイトとアドレスの3バイト + 文字)
+#   - 変わっていない文字が MERGE_GAP 文字以下しか挟まっていない run は1つにまとめる
+#     (アドレスを設定し直す3バイトより、変わっていない文字をそのまま送るほうが少ない)
+# なので、書き込むバイト数は画面の大きさではなく変わった文字の数に比例する。
+from typing import List, Optional, Tuple, Union
+from so1602.so1602 import LINE_WIDTH, write_line
+
+# run の間の変わっていない文字がこの数以下ならまとめて送る (アドレスの設定は3バイトかかる)
+MERGE_GAP = 2
+BLANK = 0x20  # Clear Display 後のDDRAMの値 (スペース)
+
+
+class FrameBuffer:
+    def __init__(self, pi, i2c_handler, lines: int = 2, width: int = LINE_WIDTH):
+        """init() (Clear Display) した直後の画面 (すべてスペース) を表示中の内容とする"""
+        self.pi = pi
+        self.i2c_handler = i2c_handler
+        self.lines = lines
+        self.width = width
+        self.buffer = [bytearray([BLANK] * width) for _ in range(lines)]
+        self.shadow: List[Optional[bytearray]] = [bytearray([BLANK] * width) for _ in range(lines)]
+
+    def write(self, line: int, text: Union[bytes, bytearray, str], column: int = 0):
+        """line 行目の column 文字目から text を書き込む (画面に反映するのは flush())。はみ出した分は捨てる"""
+        if isinstance(text, str):
+            text = text.encode()
+        text = text[:self.width - column]
+        self.buffer[line][column:column + len(text)] = text
+
+    def invalidate(self):
+        """画面の内容がわからなくなった場合 (他の処理で書き換えた場合など) に、次の flush() ですべて書き込む"""
+        for line in range(self.lines):
+            self.shadow[line] = None  # 0x00 ~ 0x07 は CGRAM の文字なので、どの値で埋めても差分にならない場合がある
+
+    def runs(self) -> List[Tuple[int, int, bytes]]:
+        """書き込みが必要な (行, 列, 文字) のリスト"""
+        runs = []
+        for line in range(self.lines):
+            buffer, shadow = self.buffer[line], self.shadow[line]
+            if shadow is None:
+                runs.append((line, 0, bytes(buffer)))
+                continue
+            start = end = None
+            for column in range(self.width):
+                if buffer[column] == shadow[column]:
+                    continue
+                if start is not None and column - end > MERGE_GAP:
+                    runs.append((line, start, bytes(buffer[start:end])))
+                    start = None
+                if start is None:
+                    start = column
+                end = column + 1
+            if start is not None:
+                runs.append((line, start, bytes(buffer[start:end])))
+        return runs
+
+    def flush(self) -> int:
+        """変わった文字だけ書き込み、I2Cで送ったバイト数を返す"""
+        sent = 0
+        for line, column, data in self.runs():
+            write_line(self.pi, self.i2c_handler, line, data, column)
+            if self.shadow[line] is None:
+                self.shadow[line] = bytearray(self.width)
+            self.shadow[line][column:column + len(data)] = data
+            sent += 3 + len(data)
+        return sent
@@ -0,0 +1,152 @@
+# SO1602 の CGRAM (自作文字) のキャッシュと、それを使った棒グラフ・スパークライン
+#
+# US2066 の CGRAM は5x8ドットの文字が8個 (文字コード 0x00 ~ 0x07) しかなく、
+# 1文字を登録するのに Set CGRAM Address + 8バイトのデータを書き込む必要がある。
+# GlyphCache は文字の内容 (8バイト) をキーにして、8個の枠を LRU のキャッシュとして使う。
+#   - 画面 (フレーム) で使う文字のうち、CGRAM にまだない文字だけを書き込む
+#   - 枠が足りなければ、そのフレームで使わない文字のうち一番長く使っていない文字の枠を使う
+#   - 続いた枠に書き込む文字は1回の I2C 転送にまとめる (CGRAM のアドレスは書き込むたびに進む)
+# 棒グラフ (1文字 = 1サンプル, 高さ8段階) は多くても8種類の文字しか使わないので、一度そろえば書き込みはなくなる。
+#
+# 枠の文字を書き換えると、その文字コードを表示している場所もすぐに変わる。
+# 追い出すのはそのフレームで使わない文字だけなので、フレームを書き込めば (FrameBuffer.flush()) 画面は揃う。
+from collections import OrderedDict
+from typing import List, Optional, Sequence
+from so1602.controller import Controller
+
+CGRAM_SLOTS = 8
+GLYPH_ROWS = 8   # 1文字の行数 (1行は下位5bit)
+GLYPH_COLUMNS = 5
+BLANK = 0x20  # 何も表示しない (スペース)
+
+
+def bar_glyph(level: int) -> bytes:
+    """下から level 行 (1 ~ 8) を塗りつぶした文字"""
+    return bytes(0b11111 if GLYPH_ROWS - row <= level else 0 for row in range(GLYPH_ROWS))
+
+
+def spark_glyph(levels: Sequence[int]) -> bytes:
+    """左の列から順に、高さ levels (1 ~ 8) の位置に点を打った文字 (多くても5列)"""
+    rows = bytearray(GLYPH_ROWS)
+    for column, level in enumerate(levels[:GLYPH_COLUMNS]):
+        rows[GLYPH_ROWS - level] |= 1 << (GLYPH_COLUMNS - 1 - column)
+    return bytes(rows)
+
+
+class GlyphCache:
+    """CGRAM の8個の枠を LRU のキャッシュとして使う"""
+
+    def __init__(self, controller: Controller, slots: int = CGRAM_SLOTS):
+        self.controller = controller
+        self.slots = slots
+        self.resident: "OrderedDict[bytes, int]" = OrderedDict()  # 文字 -> 文字コード (先頭ほど長く使っていない)
+        # 統計
+        self.uploads = 0       # CGRAM に書き込んだ文字の数
+        self.last_uploads = 0  # 最後の codes() で書き込んだ文字の数
+        self.hits = 0
+
+    def codes(self, glyphs: Sequence[bytes]) -> bytes:
+        """
+        1フレームで表示する文字のリストを文字コードに変換する (CGRAM にない文字は書き込む)
+        フレームで使う文字は slots 種類まで
+        """
+        wanted = list(OrderedDict.fromkeys(glyphs))
+        if len(wanted) > self.slots:
+            raise ValueError(f"too many glyphs in a frame: {len(wanted)} (CGRAM has {self.slots} slots)")
+
+        # このフレームで使う文字を新しい側に移してから、足りない文字の枠を古い側から選ぶ
+        missing = []
+        for glyph in wanted:
+            if glyph in self.resident:
+                self.resident.move_to_end(glyph)
+                self.hits += 1
+            else:
+                missing.append(glyph)
+        free = sorted(set(range(self.slots)) - set(self.resident.values()))
+        uploads = {}
+        for glyph in missing:
+            if free:
+                code = free.pop(0)
+            else:
+                _, code = self.resident.popitem(last=False)
+            self.resident[glyph] = code
+            uploads[code] = glyph
+        self._upload(uploads)
+        self.last_uploads = len(uploads)
+        self.uploads += len(uploads)
+        return bytes(self.resident[glyph] for glyph in glyphs)
+
+    def _upload(self, uploads: dict):
+        """文字コードが続いている文字は1回の転送で書き込む"""
+        start = None
+        rows = bytearray()
+        for code in sorted(uploads):
+            if start is not None and code != start + len(rows) // GLYPH_ROWS:
+                self.controller.write_cgram(start, rows)
+                start = None
+            if start is None:
+                start, rows = code, bytearray()
+            rows += uploads[code]
+        if start is not None:
+            self.controller.write_cgram(start, rows)
+
+    def invalidate(self):
+        """CGRAM の内容がわからなくなった場合 (電源を入れ直した場合など) に、すべて書き込み直すようにする"""
+        self.resident.clear()
+
+
+class Sparkline:
+    """
+    値の履歴を width 文字のグラフにする (新しい値が右)
+
+    columns=1: 1文字 = 1サンプルの棒グラフ (文字は8種類なので width は画面の幅まで使える)
+    columns=5: 1文字 = 5サンプルの折れ線 (点) グラフ (文字がフレームごとに変わるので width は CGRAM の枠の数まで)
+    lo, hi を指定しなければ表示する範囲の最小値・最大値に合わせる
+    """
+
+    def __init__(self, cache: GlyphCache, width: int = 16, columns: int = 1,
+                 lo: Optional[float] = None, hi: Optional[float] = None):
+        if not 1 <= columns <= GLYPH_COLUMNS:
+            raise ValueError(f"invalid columns: {columns}")
+        if columns > 1 and width > cache.slots:
+            raise ValueError(f"width must be <= {cache.slots} when columns > 1")
+        self.cache = cache
+        self.width = width
+        self.columns = columns
+        self.lo = lo
+        self.hi = hi
+
+    @property
+    def capacity(self) -> int:
+        """表示できるサンプルの数"""
+        return self.width * self.columns
+
+    def levels(self, values: Sequence[float]) -> List[int]:
+        """値を高さ 1 ~ 8 に変換する"""
+        lo = min(values) if self.lo is None else self.lo
+        hi = max(values) if self.hi is None else self.hi
+        span = hi - lo
+        if span <= 0:
+            return [GLYPH_ROWS // 2] * len(values)
+        return [1 + round(min(max((v - lo) / span, 0.0), 1.0) * (GLYPH_ROWS - 1)) for v in values]
+
+    def render(self, values: Sequence[float]) -> bytes:
+        """最新の capacity 個の値を width 文字の文字コードにする (足りない左側はスペース)"""
+        values = list(values)[-self.capacity:]
+        if not values:
+            return bytes([BLANK] * self.width)
+        levels = self.levels(values)
+        if self.columns == 1:
+            glyphs = [bar_glyph(level) for level in levels]
+        else:
+            # 右端のサンプルが最後の文字の右端の列になるように、左側の足りない列は詰めずに空ける
+            pad = (-len(levels)) % self.columns
+            glyphs = []
+            for i in range(-pad, len(levels), self.columns):
+                cell = levels[max(i, 0):i + self.columns]
+                glyph = bytearray(spark_glyph(cell))
+                if i < 0:
+                    glyph = bytearray(row >> -i for row in glyph)
+                glyphs.append(bytes(glyph))
+        codes = self.cache.codes(glyphs)
+        return bytes([BLANK] * (self.width - len(codes))) + codes
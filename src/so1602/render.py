@@ -0,0 +1,112 @@
+# ディスプレイの描画をセンサーのループから切り離す (描画スレッドと最新の値だけを持つ郵便受け)
+#
+# bme280/display.py の main はループの中で display() を呼んでいたので、
+# I2C の書き込みと完了待ちの間は次の測定に進めず、1秒ごとの測定の間隔がずれていた。
+# RenderWorker は
+#   - publish(frame) でフレームを郵便受けに入れるだけですぐに戻る (待たない)
+#   - 描画スレッドは郵便受けのフレームを取り出して描画する
+#   - 描画が追いつかない間に publish されたフレームは最新の1つだけ残し、それより前のフレームは捨てる (dropped)
+# 描画の関数 (render) は描画スレッドだけから呼ばれるので、FrameBuffer や GlyphCache はそのまま使える。
+import threading
+import time
+from typing import Any, Callable, Optional
+
+
+class RenderStats:
+    """描画の回数・捨てたフレームの数・レイテンシ (publish してから描画が終わるまで)"""
+
+    def __init__(self):
+        self.published = 0
+        self.rendered = 0
+        self.dropped = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+
+    def add(self, latency: float):
+        self.rendered += 1
+        self.latency_sum += latency
+        self.latency_max = max(self.latency_max, latency)
+
+    def mean_latency(self) -> float:
+        return self.latency_sum / self.rendered if self.rendered else 0.0
+
+    def __str__(self) -> str:
+        return (f"published={self.published}, rendered={self.rendered}, dropped={self.dropped}, "
+                f"latency(mean)={self.mean_latency() * 1000:.2f}ms, latency(max)={self.latency_max * 1000:.2f}ms")
+
+
+class LoopJitter:
+    """一定間隔のループで、予定時刻から実際に始まった時刻までの遅れ"""
+
+    def __init__(self):
+        self.count = 0
+        self.late_sum = 0.0
+        self.late_max = 0.0
+
+    def add(self, late: float):
+        self.count += 1
+        self.late_sum += late
+        self.late_max = max(self.late_max, late)
+
+    def __str__(self) -> str:
+        mean = self.late_sum / self.count if self.count else 0.0
+        return f"loops={self.count}, jitter(mean)={mean * 1000:.2f}ms, jitter(max)={self.late_max * 1000:.2f}ms"
+
+
+class RenderWorker:
+    """最新のフレームだけを持つ郵便受けと、それを描画するスレッド"""
+
+    def __init__(self, render: Callable[[Any], Any]):
+        """render(frame) の戻り値は last_result に入れる (表示用)"""
+        self.render = render
+        self.stats = RenderStats()
+        self.last_result = None
+        self.error: Optional[BaseException] = None
+        self._cond = threading.Condition()
+        self._frame = None
+        self._published_at = 0.0
+        self._pending = False
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="render", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def publish(self, frame: Any):
+        """フレームを郵便受けに入れる (まだ描画していないフレームがあれば置き換える)"""
+        if self.error is not None:
+            raise Exception("render faild...") from self.error
+        with self._cond:
+            if self._pending:
+                self.stats.dropped += 1
+            self._frame = frame
+            self._published_at = time.perf_counter()
+            self._pending = True
+            self.stats.published += 1
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                frame, published_at = self._frame, self._published_at
+                self._frame = None
+                self._pending = False
+            try:
+                self.last_result = self.render(frame)
+            except BaseException as e:
+                self.error = e
+                return
+            with self._cond:
+                self.stats.add(time.perf_counter() - published_at)
+
+    def close(self, timeout: float = None):
+        """郵便受けに残っているフレームを描画してからスレッドを終了する"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
@@ -0,0 +1,138 @@
+# SO1602 のディスプレイシフトを使った横スクロール
+#
+# so1602awwb-uc-wb/main.py (disp_03, disp_04), disp3.py, disp4.py は Entry Mode Set の S=1 (書き込むたびにシフト) で
+# 1文字ずつ write_data + sleep(0.1) し、20文字ごとに DDRAM アドレスを設定し直している。
+# 1ステップごとに I2C の書き込みがあるので、スクロールの速さが I2C の待ち時間に引きずられる。
+#
+# ここでは行の DDRAM (ring 文字で一周する) に文字を書いておき、Cursor or Display Shift で表示する位置だけを動かす。
+#   - 最初に ring 文字を1回の転送で書き込む
+#   - 1ステップは Cursor or Display Shift の1コマンド (2バイト)
+#   - 左に見えなくなった桁 (VISIBLE 文字の外側の ring - VISIBLE 桁) に、そのあと表示する文字をまとめて書き込む
+#     (書き込みはシフトのコマンドと同じ転送に入れるので、ring - VISIBLE + 1 ステップに1回だけ転送が少し長くなる)
+#   - Shift/Scroll Enable で scroll する行だけシフトする (ほかの行は固定のまま)
+#
+# SO1602 は行の先頭が 0x00, 0x20 (US2066 の4行表示と同じアドレス) なので、1行の DDRAM は LINE_WIDTH 文字で一周する。
+# (ring は行の先頭アドレスの間隔 0x20 文字までにしないと次の行に書き込んでしまう)
+#
+# 実行方法
+#   ./bin/cli oled-scroll "If there was an error the number of bytes read will be less than zero." --rate 10
+import time
+from typing import Union
+import pigpio
+from so1602.controller import Controller
+from so1602.so1602 import LINE_ADDRESS, LINE_WIDTH, VISIBLE, open_oled
+
+
+class Scroller:
+    """line 行目だけを text で横スクロールする (text は最後まで表示したら先頭に戻る)"""
+
+    def __init__(self, controller: Controller, line: int, text: Union[bytes, str], ring: int = LINE_WIDTH,
+                 visible: int = VISIBLE):
+        if isinstance(text, str):
+            text = text.encode()
+        if not text:
+            raise ValueError("empty text")
+        if not 0 < visible < ring <= LINE_ADDRESS[1]:
+            raise ValueError(f"invalid visible/ring: {visible}/{ring}")
+        self.controller = controller
+        self.line = line
+        self.text = text
+        self.ring = ring
+        self.visible = visible
+        self.position = 0  # 表示している先頭の文字 (text を繰り返した文字列の位置)
+        self.loaded = 0    # DDRAM に書き込んだ文字 (position 以降の文字がどこまで書き込まれているか)
+        # 統計
+        self.steps = 0
+        self.refills = 0
+        self.chars = 0
+
+    def _char(self, index: int) -> int:
+        return self.text[index % len(self.text)]
+
+    def _load(self, end: int):
+        """loaded から end の手前までの文字を書き込む (ring の端で折り返す場合は2回に分ける)"""
+        while self.loaded < end:
+            column = self.loaded % self.ring
+            count = min(end - self.loaded, self.ring - column)
+            data = bytes(self._char(i) for i in range(self.loaded, self.loaded + count))
+            self.controller.write(self.line, data, column)
+            self.loaded += count
+            self.chars += count
+        self.refills += 1
+
+    def start(self):
+        """シフトを戻して ring 文字を書き込み、line 行目だけシフトするようにする"""
+        controller = self.controller
+        controller.return_home()  # ディスプレイシフトを元の位置に戻す
+        controller.enable_line_shift(1 << self.line)
+        self.position = self.loaded = 0
+        self._load(self.ring)
+
+    def step(self):
+        """1文字左にスクロールする"""
+        self.controller.cursor_shift(display=True, right=False)
+        self.position += 1
+        self.steps += 1
+        if self.position + self.visible > self.loaded:
+            # 見えなくなった桁 (今は text[loaded - ring] 以降が入っている) に次の文字を書き込む
+            # シフトのコマンドと同じ転送で送り、シフトのあとに書き込まれる
+            self._load(self.position + self.ring)
+        else:
+            self.controller.flush()
+
+    def stop(self):
+        """すべての行がシフトする既定の設定に戻し、シフトを元の位置に戻す"""
+        self.controller.enable_line_shift(0b1111)
+        self.controller.return_home()
+
+    def run(self, rate: float = 10.0, duration: float = None):
+        """
+        rate[文字/sec] でスクロールする (duration[sec] を指定した場合はその時間で終了する)
+        遅れた場合は取り戻そうとせずに今から数え直す
+        """
+        period = 1 / rate
+        now = time.monotonic()
+        end = None if duration is None else now + duration
+        due = now + period
+        while end is None or due <= end:
+            wait = due - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+            self.step()
+            due = max(due + period, time.monotonic())
+
+
+def main(pi, i2c_handler, text: Union[bytes, str], line: int = 1, rate: float = 10.0, duration: float = None,
+         ring: int = LINE_WIDTH, header: bytes = b"Text:"):
+    """1行目に header を表示し、line 行目で text をスクロールする"""
+    controller = Controller(pi, i2c_handler)
+    controller.init()
+    controller.write(0 if line else 1, header)
+    scroller = Scroller(controller, line, text, ring)
+    scroller.start()
+    start = time.perf_counter()
+    try:
+        scroller.run(rate, duration)
+    finally:
+        elapsed = time.perf_counter() - start
+        print(f"steps: {scroller.steps} ({scroller.steps / elapsed:.2f}/sec), refills: {scroller.refills}, "
+              f"chars: {scroller.chars}, I2C transactions: {controller.transactions}")
+        scroller.stop()
+        controller.off()
+
+
+def run(text: str, line: int = 1, rate: float = 10.0, duration: float = None, ring: int = LINE_WIDTH):
+    pi = pigpio.pi()
+    if not pi.connected:
+        raise Exception("pigpio connection faild...")
+    i2c_handler = open_oled(pi)
+    try:
+        main(pi, i2c_handler, text, line, rate, duration, ring)
+    finally:
+        pi.i2c_close(i2c_handler)
+        pi.stop()
+
+
+if __name__ == "__main__":
+    run("If there was an error the number of bytes read will be less than zero "
+        "(and will contain the error code).  ")
@@ -0,0 +1,144 @@
+# SO1602AWWB-UC-WB (有機ELキャラクタディスプレイ, コントローラー: US2066) の I2C ドライバー
+#
+# 取扱説明書:
+#   https://akizukidenshi.com/download/ds/akizuki/so1602awwb-uc-wb-u_akizuki_manu.pdf
+# データシート:
+#   https://akizukidenshi.com/download/ds/sunlike/SO1602AWWB-UC-WB-U.pdf
+#
+# so1602awwb-uc-wb/*.py (動作確認用のスクリプト) と同じ処理を他のパッケージから使えるようにしたもの。
+#
+# コントロールバイト
+#   Co D/C 0 0 0 0 0 0
+#   - Co : (1) このあとに1バイト送ったら次もコントロールバイト
+#          (0) このあとはすべてデータ (ストリーム)
+#   - D/C: (1) データ (DDRAMへの書き込み)
+#          (0) コマンド
+# write_data は1文字ごとに [0x40, data] を送っているので、20文字の行は20回の I2C 転送がかかる。
+# write_line / write_data_block は Co=0 のデータストリームで行をまとめて1回の転送で書き込む。
+#
+# コマンドの完了待ち
+#   コントロールバイト (D/C=0) を書き込んでから1バイト読むと、ビジーフラグ (bit7) とアドレスカウンターが読める。
+#   write_command はビジーフラグが0になるまで読み続け、すぐに次の処理に進む (50ms の sleep はしない)。
+#   読めない場合 (配線・モジュールによっては I2C の読み込みができない) は、以降そのハンドルでは
+#   コマンドごとの最大実行時間 (command_time) だけ sleep する ([WARN] を1回表示する)。
+#   COMMAND_TIMEOUT を過ぎてもビジーのままの場合は command_time だけ待つが、次のコマンドではまたビジーフラグを読む。
+#
+# IS/RE/SD の切り替えが必要なコマンドは controller.py (Controller) を使う。
+import time
+from time import sleep
+from typing import Dict, Union
+import pigpio
+
+I2C_BUS = 1
+I2C_ADDRESS = 0x3C  # SA0=L (SA0=Hの場合は0x3D)  (i2cdetect 1コマンドで確認)
+
+CONTROL_COMMAND = 0b00000000         # Co=0, D/C=0: コマンド
+CONTROL_DATA = 0b01000000            # Co=0, D/C=1: このあとはすべてデータ
+CONTROL_COMMAND_CONTINUE = 0b10000000  # Co=1, D/C=0: コマンド1バイトのあとにコントロールバイトが続く
+
+# 各行の先頭のDDRAMアドレス (SO1602は2行。US2066を4行表示で使う場合は3, 4行目が 0x40, 0x60)
+LINE_ADDRESS = [0x00, 0x20, 0x40, 0x60]
+# 1行のDDRAMの文字数 (表示されるのは VISIBLE 文字)
+LINE_WIDTH = 20
+# 1行に表示される文字数
+VISIBLE = 16
+
+BUSY_FLAG = 0b10000000
+# ビジーフラグを読み続ける最大時間[sec]
+COMMAND_TIMEOUT = 0.01
+# コマンドの最大実行時間[sec] (ビジーフラグを読めない場合に使う。データシートの値に余裕を持たせたもの)
+CLEAR_DISPLAY_TIME = 0.002    # Clear Display (0x01)
+RETURN_HOME_TIME = 0.002      # Return Home (0x02, 0x03)
+DEFAULT_COMMAND_TIME = 0.0001  # その他のコマンド
+DATA_TIME = 0.0001            # DDRAMへの書き込み
+
+# ハンドルごとにビジーフラグを読めるかどうか (初めてコマンドを送ったときに確認する)
+_busy_flag_readable: Dict[int, bool] = {}
+
+
+def command_time(command: int) -> float:
+    """コマンドの最大実行時間[sec]"""
+    if command == 0b00000001:
+        return CLEAR_DISPLAY_TIME
+    if command & 0b11111110 == 0b00000010:
+        return RETURN_HOME_TIME
+    return DEFAULT_COMMAND_TIME
+
+
+def read_status(pi, i2c_handler) -> int:
+    """ビジーフラグ (bit7) とアドレスカウンター (bit6 ~ bit0) を読み込む"""
+    return pi.i2c_read_byte_data(i2c_handler, CONTROL_COMMAND)
+
+
+def wait_ready(pi, i2c_handler, fallback: float):
+    """
+    ビジーフラグが0になるまで待つ
+    タイムアウトした場合は fallback[sec] だけ待つ (次のコマンドではまたビジーフラグを読む)
+    読めない (I2Cの読み込みに失敗した) 場合は fallback[sec] だけ待ち、以降はこのハンドルでは読まずに sleep する
+    """
+    if _busy_flag_readable.get(i2c_handler, True):
+        deadline = time.monotonic() + COMMAND_TIMEOUT
+        try:
+            while True:
+                status = read_status(pi, i2c_handler)
+                if status < 0:
+                    break
+                if not status & BUSY_FLAG:
+                    _busy_flag_readable[i2c_handler] = True
+                    return
+                if time.monotonic() > deadline:
+                    # 遅いコマンドや一時的な不具合かもしれないので、読むのはやめない
+                    sleep(fallback)
+                    return
+        except pigpio.error:
+            pass
+        _busy_flag_readable[i2c_handler] = False
+        print(f"[WARN] busy flag is not readable (i2c handle={i2c_handler}), use fixed waits.")
+    sleep(fallback)
+
+
+def write_data(pi, i2c_handler, data: int):
+    control_byte = CONTROL_DATA  # コントロールバイト: データ書込みは bit6=1
+    pi.i2c_write_device(i2c_handler, bytes([control_byte, data]))
+    wait_ready(pi, i2c_handler, DATA_TIME)
+
+
+def write_command(pi, i2c_handler, command: int):
+    control_byte = CONTROL_COMMAND  # コントロールバイト: コマンドは bit6=0
+    pi.i2c_write_device(i2c_handler, bytes([control_byte, command]))
+    wait_ready(pi, i2c_handler, command_time(command))
+
+
+def write_data_block(pi, i2c_handler, data: Union[bytes, bytearray]):
+    """現在のDDRAMアドレスから data をまとめて書き込む (1回の I2C 転送)"""
+    pi.i2c_write_device(i2c_handler, bytes([CONTROL_DATA]) + bytes(data))
+
+
+def write_line(pi, i2c_handler, line: int, data: Union[bytes, bytearray], column: int = 0):
+    """
+    line 行目の column 文字目から data を書き込む
+
+    Set DDRAM Address のコマンド (Co=1) と Co=0 のデータストリームを1回の I2C 転送にまとめる
+    (DDRAMアドレスの設定はすぐに終わるので完了は待たない)
+    """
+    address = LINE_ADDRESS[line] + column
+    pi.i2c_write_device(i2c_handler, bytes([CONTROL_COMMAND_CONTINUE, 0b10000000 | address, CONTROL_DATA]) + bytes(data))
+
+
+def init(pi, i2c_handler):
+    """初期化処理 (モードの切り替えとコマンドは Controller でまとめて送る)"""
+    from so1602.controller import Controller
+    Controller(pi, i2c_handler).init()
+
+
+def off(pi, i2c_handler):
+    """終了処理"""
+    from so1602.controller import Controller
+    Controller(pi, i2c_handler).off()
+
+
+def open_oled(pi, i2c_address: int = I2C_ADDRESS, i2c_bus: int = I2C_BUS):
+    i2c_handler = pi.i2c_open(i2c_bus, i2c_address)
+    # 閉じたハンドルの番号が再利用されることがあるので、ビジーフラグを読めるかどうかは確認し直す
+    _busy_flag_readable.pop(i2c_handler, None)
+    return i2c_handler
@@ -13,6 +13,15 @@ def write_command(pi, i2c_handler, command: int):
     sleep(0.05)
 
 
+def write_data_block(pi, i2c_handler, data: bytes):
+    """
+    データをまとめて書き込む
+    コントロールバイトの Co=0 (bit7) はこのあとがすべてデータであることを表すので、1回の転送で複数文字を書き込める
+    """
+    control_byte = 0b01000000  # Co=0, D/C=1
+    pi.i2c_write_device(i2c_handler, bytes([control_byte]) + data)
+
+
 def init(pi, i2c_handler):
     """初期化処理"""
     # Clear Display (IS=X, RE=X, SD=0)
@@ -91,8 +100,7 @@ def main(pi, i2c_handler):
     ※ 長文の表示で利用
     """
     l1 = b"Text:"
-    for char in l1:
-        write_data(pi, i2c_handler, char)
+    write_data_block(pi, i2c_handler, l1)
     sleep(1)
 
     # Entry Mode Set (IS=0, RE=0, SD=0)
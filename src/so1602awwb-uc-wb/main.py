@@ -20,6 +20,15 @@ def write_command(pi, i2c_handler, command: int):
     sleep(0.05)
 
 
+def write_data_block(pi, i2c_handler, data: bytes):
+    """
+    データをまとめて書き込む
+    コントロールバイトの Co=0 (bit7) はこのあとがすべてデータであることを表すので、1回の転送で複数文字を書き込める
+    """
+    control_byte = 0b01000000  # Co=0, D/C=1
+    pi.i2c_write_device(i2c_handler, bytes([control_byte]) + data)
+
+
 def init(pi, i2c_handler):
     # Clear Display (IS=X, RE=X, SD=0)
     #   全DDRAMに0x20を書き込み、DDRAMを0x00(1行目先頭)に設定
@@ -133,14 +142,12 @@ def disp_01(pi, i2c_handler):
     # IS=0, RE=0, SD=0
 
     l1 = b"Temp  Pres Hum"
-    for char in l1:
-        write_data(pi, i2c_handler, char)
+    write_data_block(pi, i2c_handler, l1)
 
     ddram_addr = 0b00100000  # 2行目の先頭 (0x20)
     write_command(pi, i2c_handler, 0b10000000 | ddram_addr)  # Set DDRAM RAM Address
     l2 = b"24.34 1012 50.35"
-    for ch in l2:
-        write_data(pi, i2c_handler, ch)  # 0xB1 = ア
+    write_data_block(pi, i2c_handler, l2)
 
     sleep(10)
 
@@ -152,14 +159,12 @@ def disp_02(pi, i2c_handler):
     # 設定
 
     l1 = b"Temp  Pres Hum"  # 20byteまで保持できる
-    for char in l1:
-        write_data(pi, i2c_handler, char)
+    write_data_block(pi, i2c_handler, l1)
 
     ddram_addr = 0b00100000  # 2行目の先頭 (0x20)
     write_command(pi, i2c_handler, 0b10000000 | ddram_addr)  # Set DDRAM RAM Address
     l2 = b"24.34 1012 50.35"
-    for ch in l2:
-        write_data(pi, i2c_handler, ch)  # 0xB1 = ア
+    write_data_block(pi, i2c_handler, l2)
     
     while (True):
         # Cursor or Display Shift (IS=0, RE=0, SD=0)
@@ -180,8 +185,7 @@ def disp_03(pi, i2c_handler):
     ※ 長文の表示で利用
     """
     l1 = b"Text:"
-    for char in l1:
-        write_data(pi, i2c_handler, char)
+    write_data_block(pi, i2c_handler, l1)
     sleep(1)
 
     # Entry Mode Set (IS=0, RE=0, SD=0)
@@ -219,8 +223,7 @@ def disp_04(pi, i2c_handler):
     ※ 長文の表示で利用
     """
     l1 = b"Text:"
-    for char in l1:
-        write_data(pi, i2c_handler, char)
+    write_data_block(pi, i2c_handler, l1)
     sleep(1)
 
     # Entry Mode Set (IS=0, RE=0, SD=0)
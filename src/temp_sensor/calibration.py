@@ -0,0 +1,172 @@
+# 温度センサー (プローブ) ごとのキャリブレーションと、10bitの値 -> 温度の変換テーブル
+#
+# これまでは1サンプルごとに (value / 1023.0) * VREF と (volt - 0.6) / 0.01 を浮動小数点で計算していて、
+# 定数も固定だったのでプローブごとの補正ができなかった。
+# ここではプローブごとに以下のどちらかで補正し、1024個 (10bitの値すべて) の温度をあらかじめ計算しておく。
+#   - ゲイン・オフセット: temp = 公称の式の温度 * gain + offset
+#   - 校正点 (value, temp): 2点以上なら折れ線で補間 (範囲外は両端の線分を延長)、1点ならオフセットだけ補正
+# 変換はテーブルを引くだけになる (convert_many でまとめて変換できる)。
+#
+# キャリブレーションは ~/.config/iot-work/temp_probes.json に保存し、起動時に読み込む。
+#   ./bin/cli temp-calibrate lm61 --point 262:25.0 --point 293:35.0
+import json
+import os
+from typing import List, NamedTuple, Optional, Tuple
+
+DEFAULT_CALIBRATION_PATH = os.path.join(os.path.expanduser("~"), ".config", "iot-work", "temp_probes.json")
+
+RESOLUTION = 1024  # 10bit
+
+
+class Calibration(NamedTuple):
+    """プローブのキャリブレーション"""
+    name: str = "default"
+    vref: float = 3.3            # A/Dコンバータの基準電圧
+    zero_volt: float = 0.6       # 0℃のときの電圧 (0℃で600mV)
+    volt_per_degc: float = 0.01  # 1℃あたりの電圧 (1℃につき10mV増減)
+    gain: float = 1.0
+    offset: float = 0.0
+    points: Tuple[Tuple[float, float], ...] = ()  # 校正点 (value, temp)
+
+    def nominal(self, value: float) -> float:
+        """公称の式で値を温度に変換する"""
+        volt = (value / (RESOLUTION - 1)) * self.vref
+        return (volt - self.zero_volt) / self.volt_per_degc
+
+    def temp(self, value: float) -> float:
+        """補正した温度 (テーブルを作るときだけ使う)"""
+        points = sorted(self.points)
+        if len(points) >= 2:
+            for (x0, y0), (x1, y1) in zip(points, points[1:]):
+                if value <= x1:
+                    break
+            return y0 + (y1 - y0) * (value - x0) / (x1 - x0)
+        temp = self.nominal(value) * self.gain
+        if len(points) == 1:
+            x, y = points[0]
+            return temp + y - self.nominal(x) * self.gain
+        return temp + self.offset
+
+    def build_table(self) -> "TemperatureTable":
+        # 保存したファイルを手で編集した場合なども、どこから読み込んでも同じエラーにする
+        check_points(tuple(sorted(self.points)))
+        return TemperatureTable([self.temp(value) for value in range(RESOLUTION)])
+
+    def to_dict(self) -> dict:
+        data = self._asdict()
+        data["points"] = [list(p) for p in self.points]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Calibration":
+        data = dict(data)
+        data["points"] = tuple(tuple(p) for p in data.get("points", ()))
+        return cls(**data)
+
+
+class TemperatureTable:
+    """10bitの値 -> 温度の変換テーブル"""
+
+    def __init__(self, table: List[float]):
+        self.table = table
+
+    def __getitem__(self, value: int) -> float:
+        return self.table[value]
+
+    def convert_many(self, values: List[int]) -> List[float]:
+        table = self.table
+        return [table[v] for v in values]
+
+    def convert(self, value: float) -> float:
+        """平均や間引いた後の小数の値は隣の2つの値の間で補間する"""
+        if value <= 0:
+            return self.table[0]
+        if value >= RESOLUTION - 1:
+            return self.table[RESOLUTION - 1]
+        i = int(value)
+        return self.table[i] + (self.table[i + 1] - self.table[i]) * (value - i)
+
+
+class CalibrationStore:
+    """プローブ名ごとのキャリブレーションをJSONファイルに保存する"""
+
+    def __init__(self, path: str = DEFAULT_CALIBRATION_PATH):
+        self.path = path
+        self._calibrations = None
+
+    def _load(self) -> dict:
+        if self._calibrations is None:
+            try:
+                with open(self.path) as f:
+                    self._calibrations = json.load(f)
+            except (FileNotFoundError, ValueError):
+                self._calibrations = {}
+        return self._calibrations
+
+    def get(self, name: str) -> Optional[Calibration]:
+        data = self._load().get(name)
+        return None if data is None else Calibration.from_dict(data)
+
+    def put(self, calibration: Calibration):
+        calibrations = self._load()
+        calibrations[calibration.name] = calibration.to_dict()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(calibrations, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def load_table(probe: str = None, path: str = DEFAULT_CALIBRATION_PATH) -> TemperatureTable:
+    """
+    プローブのキャリブレーションを読み込んで変換テーブルを作る
+    probe が None の場合は "default" が保存されていればそれを、なければ公称の式を使う
+    """
+    store = CalibrationStore(path)
+    calibration = store.get(probe or "default")
+    if calibration is None:
+        if probe is not None:
+            raise Exception(f"calibration not found: {probe} ({path})")
+        calibration = Calibration()
+    return calibration.build_table()
+
+
+def parse_point(text: str) -> Tuple[float, float]:
+    """ "262:25.0" (値:温度) のような文字列を校正点に変換する"""
+    value, _, temp = text.partition(":")
+    if not temp:
+        raise ValueError(f"invalid point: {text} (e.g. 262:25.0)")
+    return float(value), float(temp)
+
+
+def check_points(points: Tuple[Tuple[float, float], ...]):
+    """校正点の値 (value) が重複せず、小さい順に並んでいること (折れ線の補間で 0 で割らないように)"""
+    for (x0, _), (x1, _) in zip(points, points[1:]):
+        if x1 <= x0:
+            raise Exception(f"calibration faild... (points must have strictly increasing values: {x0}, {x1})")
+
+
+def main(name: str, points: List[str] = (), gain: float = None, offset: float = None, vref: float = None,
+         path: str = DEFAULT_CALIBRATION_PATH):
+    """キャリブレーションを保存する (指定しなかった項目は保存済みの値のまま)。何も指定しなければ表示だけ行う"""
+    store = CalibrationStore(path)
+    calibration = store.get(name) or Calibration(name=name)
+    changes = {}
+    if points:
+        changes["points"] = tuple(sorted(parse_point(p) for p in points))
+    if gain is not None:
+        changes["gain"] = gain
+    if offset is not None:
+        changes["offset"] = offset
+    if vref is not None:
+        changes["vref"] = vref
+    if changes:
+        calibration = calibration._replace(**changes)
+
+    table = calibration.build_table()  # テーブルを作れることを確認してから保存する
+    if changes:
+        store.put(calibration)
+        print(f"[INFO] saved: {path}")
+    print(calibration)
+    for value in (0, 186, 248, 279, 310, 1023):  # 両端と 0℃, 20℃, 30℃, 40℃ 付近
+        print(f"value: {value:>4}, nominal: {calibration.nominal(value):8.3f}, temp: {table[value]:8.3f}")
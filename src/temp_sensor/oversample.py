@@ -0,0 +1,123 @@
+# オーバーサンプリングとデシメーションで分解能を上げる
+#
+# MCP3002 (10bit, VREF=3.3V) の1LSBは 3.3V / 1023 = 3.2mV で、温度センサー (10mV/℃) では約0.32℃になる。
+# temp_pigpio.py は1秒に1回しか変換しないので、表示される温度は0.32℃刻みで変化する。
+# ここでは kHz のレートで変換し、CICフィルター (積分器 -> 間引き -> 櫛形フィルター) で
+# factor 個ごとに1個の値に間引く。ノイズがLSB程度あれば、factor = 4^k で分解能が約 k bit 上がる。
+#   - order=1 は factor 個の単純平均と同じ
+#   - order を上げると折り返しノイズを減らせるが、起動直後の order 個の出力は過渡応答になる
+#
+# 実行方法
+#   ./bin/cli --debug temp-oversample --clock 500000 --factor 256 --order 2
+#   ./bin/cli temp-bench-clock --clock 50000 --clock 100000 --clock 500000 --clock 1000000
+import math
+import time
+from typing import List, Optional
+from temp_sensor.temp_spidev import SpiDev, FakeSpiDev, FRAME_SIZE, read_burst
+from temp_sensor.calibration import load_table
+
+
+class CicDecimator:
+    """CICフィルターで factor 個の値を1個に間引く (出力は入力と同じスケール)"""
+
+    def __init__(self, factor: int, order: int = 1):
+        if factor < 1 or order < 1:
+            raise ValueError(f"invalid factor/order: {factor}/{order}")
+        self.factor = factor
+        self.order = order
+        self.gain = factor ** order
+        self.integrators = [0] * order
+        self.combs = [0] * order
+        self.count = 0
+
+    def push(self, value: int) -> Optional[float]:
+        """1個入力し、factor 個ごとに間引いた値を返す (それ以外はNone)"""
+        integrators = self.integrators
+        for i in range(self.order):
+            value += integrators[i]
+            integrators[i] = value
+        self.count += 1
+        if self.count < self.factor:
+            return None
+        self.count = 0
+        combs = self.combs
+        for i in range(self.order):
+            value, combs[i] = value - combs[i], value
+        return value / self.gain
+
+    def feed(self, values: List[int]) -> List[float]:
+        outputs = []
+        for value in values:
+            out = self.push(value)
+            if out is not None:
+                outputs.append(out)
+        return outputs
+
+    def effective_bits(self, bits: int = 10) -> float:
+        """ノイズがホワイトノイズの場合の実効分解能[bit]の目安"""
+        return bits + math.log(self.factor, 4)
+
+
+def open_dev(chip_select: int, clock: int, fake: bool):
+    SPI_MODE = 0b00  # SPIモード0
+    return FakeSpiDev() if fake else SpiDev(0, chip_select, clock, SPI_MODE)
+
+
+def main(debug: bool, chip_select: int, channel: int, clock: int = 500000, factor: int = 256, order: int = 2,
+         fake: bool = False, probe: str = None):
+    """
+    clock[Hz] のSPIクロックで変換し続け、factor 個ごとに間引いた温度を表示する
+    (factor 回ずつ read_burst でまとめて変換する)
+    """
+    decimator = CicDecimator(factor, order)
+    table = load_table(probe)
+    dev = open_dev(chip_select, clock, fake)
+    print(f"[INFO] clock={clock}Hz, factor={factor}, order={order}, "
+          f"effective_bits={decimator.effective_bits():.1f}bit "
+          f"(1LSB={3.3 / 1023 / 0.01 / 2 ** (decimator.effective_bits() - 10):.3f}DegC)")
+    try:
+        last = time.perf_counter()
+        while True:
+            for value in decimator.feed(read_burst(dev, channel, factor)):
+                now = time.perf_counter()
+                if debug:
+                    print(f"value: {value:.3f}, temp: {table.convert(value):.3f}, "
+                          f"conversions/sec: {factor / (now - last):.0f}")
+                else:
+                    print(f"Temp: {table.convert(value):.3f}")
+                last = now
+    finally:
+        dev.close()
+        print("[info] spi closed.")
+
+
+def bench(chip_select: int, clocks: List[int], n: int = 2000, fake: bool = False):
+    """
+    SPIクロックごとに1秒あたりの変換回数を計測する
+      - bus      : クロックから計算した上限 (1回の変換 = FRAME_SIZE * 8 クロック。CSの切り替えなどは含まない)
+      - per-call : 1回の変換ごとに1回の ioctl (Pythonのループとシステムコールが律速になりやすい)
+      - burst    : MAX_BURST 回の変換を1回の ioctl にまとめる (read_burst)
+    burst の実測が bus の上限に近ければバス律速、クロックを上げても伸びなければ Python (CPU) 律速
+    """
+    print(f"{'clock[Hz]':>10} {'bus':>10} {'per-call':>10} {'burst':>10} {'burst/bus':>10}")
+    for clock in clocks:
+        dev = open_dev(chip_select, clock, fake)
+        try:
+            bus = clock / (FRAME_SIZE * 8)
+            start = time.perf_counter()
+            for _ in range(n):
+                read_burst(dev, 0, 1)
+            per_call = n / (time.perf_counter() - start)
+
+            start = time.perf_counter()
+            read_burst(dev, 0, n)
+            burst_rate = n / (time.perf_counter() - start)
+        finally:
+            dev.close()
+        print(f"{clock:>10} {bus:>10.0f} {per_call:>10.0f} {burst_rate:>10.0f} {burst_rate / bus:>10.2f}")
+
+
+if __name__ == "__main__":
+    CHIP_SELECT = 0  # ラズパイの CE0端子, CE1端子どちらに接続するか
+    CHANNEL = 0  # MCP3002のCH0端子,CH1端子どちらを利用するか
+    main(True, CHIP_SELECT, CHANNEL)
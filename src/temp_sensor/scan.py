@@ -0,0 +1,202 @@
+# MCP3002 / MCP3004 / MCP3008 の複数チャンネルをまとめて読み込む
+#
+# temp_pigpio.py, temp_wiringpi.py は1プロセスで1チャンネルしか読めないので、
+# 1つのチップセレクトに複数のアナログセンサーをつなぐ場合はチャンネルの数だけプロセスが必要になる。
+# ここでは1つのループでチャンネルのリストを読み込む。
+#   - レートを指定しないチャンネルは interval ごとに毎回 (ラウンドロビン) 読み込む
+#   - レート[Hz]を指定したチャンネルはそのレートで読み込む
+#   - 同じ時刻に読むチャンネルのコマンドは1回の転送 (spidev なら1回の ioctl) にまとめる
+#   - コマンドのバイト列はチャンネル (の組み合わせ) ごとに1回だけ作って使い回す
+#
+# 実行方法
+#   ./bin/cli temp-scan --chip mcp3008 --channel 0 --channel 1 --channel 2:10 --fake
+import heapq
+import time
+from typing import Callable, Dict, List, NamedTuple, Tuple
+from temp_sensor.temp_spidev import SpiDev, FakeSpiDev
+from temp_sensor.calibration import load_table
+
+
+class Chip(NamedTuple):
+    """A/Dコンバータの種類"""
+    name: str
+    channels: int
+    frame_size: int  # 1回の変換の転送バイト数
+
+    def frame(self, channel: int) -> bytes:
+        """シングルエンドモードで channel を変換するコマンド"""
+        if self.frame_size == 2:
+            # MCP3002: 0 1(start) 1(SGL) ODD 1(MSBF) 000 00000000
+            return (0b0110100000000000 | channel << 12).to_bytes(2, "big")
+        # MCP3004/MCP3008: 0000000 1(start) | 1(SGL) D2 D1 D0 0000 | 00000000
+        return bytes([0b00000001, 0b10000000 | channel << 4, 0b00000000])
+
+
+CHIPS = {
+    "mcp3002": Chip("mcp3002", 2, 2),
+    "mcp3004": Chip("mcp3004", 4, 3),
+    "mcp3008": Chip("mcp3008", 8, 3),
+}
+
+
+class ScanChannel(NamedTuple):
+    channel: int
+    rate: float = None  # 読み込むレート[Hz] (None: ラウンドロビン)
+
+
+class ScanSample(NamedTuple):
+    channel: int
+    timestamp: float  # 転送が終わった時刻 (time.time())
+    value: int        # 10bitの値
+
+
+def parse_channel(text: str) -> ScanChannel:
+    """ "0" (ラウンドロビン), "2:10" (10Hz) のような文字列を ScanChannel に変換する"""
+    channel, _, rate = text.partition(":")
+    return ScanChannel(int(channel), float(rate) if rate else None)
+
+
+class PigpioSpi:
+    """
+    pigpio の spi_xfer で転送する
+
+    spi_xfer を1回で呼ぶと転送の間CSがLOWのままになり、2回目以降の変換が始まらないので、1回の変換ごとに呼び出す
+    """
+
+    def __init__(self, pi, spi_handler):
+        self.pi = pi
+        self.spi_handler = spi_handler
+
+    def transfer(self, tx_data: bytes, frame_size: int) -> bytes:
+        rx = bytearray()
+        for i in range(0, len(tx_data), frame_size):
+            _, data = self.pi.spi_xfer(self.spi_handler, tx_data[i:i + frame_size])
+            rx.extend(data)
+        return bytes(rx)
+
+    def close(self):
+        self.pi.spi_close(self.spi_handler)
+
+
+class Scanner:
+    """チャンネルのリストをスケジュールに従って読み込む"""
+
+    def __init__(self, dev, chip: Chip, channels: List[ScanChannel], interval: float = 0.0):
+        """
+        dev: transfer(tx_data, frame_size) -> bytes を持つもの (SpiDev, FakeSpiDev, PigpioSpi)
+        interval: ラウンドロビンのチャンネルを読み込む間隔[sec] (0: 待たずに繰り返す)
+        """
+        for c in channels:
+            if not 0 <= c.channel < chip.channels:
+                raise ValueError(f"invalid channel: {c.channel} ({chip.name} has {chip.channels} channels)")
+            if c.rate is not None and c.rate <= 0:
+                raise ValueError(f"invalid rate: {c.rate} (channel {c.channel})")
+        self.dev = dev
+        self.chip = chip
+        self.channels = channels
+        self.interval = interval
+        self.frames = {c.channel: chip.frame(c.channel) for c in channels}
+        self._tx_cache: Dict[Tuple[int, ...], bytes] = {}
+
+    def _tx(self, channels: Tuple[int, ...]) -> bytes:
+        if channels not in self._tx_cache:
+            self._tx_cache[channels] = b"".join(self.frames[ch] for ch in channels)
+        return self._tx_cache[channels]
+
+    def read(self, channels: Tuple[int, ...]) -> List[ScanSample]:
+        """channels を1回の転送で読み込む"""
+        frame_size = self.chip.frame_size
+        rx = self.dev.transfer(self._tx(channels), frame_size)
+        timestamp = time.time()
+        return [
+            ScanSample(ch, timestamp, int.from_bytes(rx[i * frame_size:(i + 1) * frame_size], "big") & 0b1111111111)
+            for i, ch in enumerate(channels)
+        ]
+
+    def run(self, on_sample: Callable[[ScanSample], None], duration: float = None):
+        """
+        読み込むたびに on_sample(sample) を呼び出す
+        duration[sec] を指定した場合はその時間で終了する
+        """
+        periods = [self.interval if c.rate is None else 1 / c.rate for c in self.channels]
+        now = time.monotonic()
+        end = None if duration is None else now + duration
+        queue = [(now, i) for i in range(len(self.channels))]
+        heapq.heapify(queue)
+
+        while True:
+            due = queue[0][0]
+            if end is not None and due > end:
+                break
+            wait = due - time.monotonic()
+            if wait > 0:
+                time.sleep(wait)
+
+            # 時刻になったチャンネルをまとめて読み込む
+            now = time.monotonic()
+            ready = []
+            while queue and queue[0][0] <= now:
+                ready.append(heapq.heappop(queue))
+            for sample in self.read(tuple(self.channels[i].channel for _, i in ready)):
+                on_sample(sample)
+
+            for due, i in ready:
+                due += periods[i]
+                # 遅れが1周期を超えた場合は取り戻そうとせずに今から数え直す
+                heapq.heappush(queue, (max(due, now), i))
+
+
+def parse_probe(text: str) -> Tuple[int, str]:
+    """ "0=lm61" (チャンネル=プローブ名) のような文字列を変換する"""
+    channel, _, probe = text.partition("=")
+    if not probe:
+        raise ValueError(f"invalid probe: {text} (e.g. 0=lm61)")
+    return int(channel), probe
+
+
+def main(debug: bool, chip_select: int, chip_name: str, channels: List[str], interval: float = 1.0,
+         duration: float = None, backend: str = "spidev", fake: bool = False, probes: List[str] = ()):
+    """probes: チャンネルごとのプローブ名 ("0=lm61" など。指定しないチャンネルは "default")"""
+    chip = CHIPS[chip_name]
+    scan_channels = [parse_channel(c) for c in channels]
+    probe_names = dict(parse_probe(p) for p in probes)
+    tables = {c.channel: load_table(probe_names.get(c.channel)) for c in scan_channels}
+
+    CLOCK_SPEED = 50000  # 50KHz
+    SPI_MODE = 0b00  # SPIモード0
+    pi = None
+    if fake:
+        dev = FakeSpiDev()
+    elif backend == "pigpio":
+        import pigpio
+        pi = pigpio.pi()
+        if not pi.connected:
+            raise Exception("pigpio connection faild...")
+        dev = PigpioSpi(pi, pi.spi_open(chip_select, CLOCK_SPEED, SPI_MODE))
+    else:
+        dev = SpiDev(0, chip_select, CLOCK_SPEED, SPI_MODE)
+
+    counts = {c.channel: 0 for c in scan_channels}
+
+    def on_sample(sample: ScanSample):
+        counts[sample.channel] += 1
+        if debug:
+            print(f"[ch{sample.channel}] {sample.timestamp:.6f} value: {sample.value}, temp: {tables[sample.channel][sample.value]}")
+        else:
+            print(f"[ch{sample.channel}] {sample.timestamp:.6f} Temp: {tables[sample.channel][sample.value]}")
+
+    start = time.monotonic()
+    try:
+        Scanner(dev, chip, scan_channels, interval).run(on_sample, duration)
+    finally:
+        elapsed = time.monotonic() - start
+        for channel, count in counts.items():
+            print(f"[STATS] ch{channel}: samples={count}, rate={count / elapsed:.2f}Hz")
+        dev.close()
+        if pi is not None:
+            pi.stop()
+        print("[info] spi closed.")
+
+
+if __name__ == "__main__":
+    main(True, 0, "mcp3002", ["0", "1"], interval=1.0, fake=True)
@@ -1,6 +1,7 @@
 import pigpio
 import time
 from typing import Union
+from temp_sensor.calibration import load_table
 
 def int_to_binary(n: int, bits: int = 8):
     return ''.join([str(n >> i & 1 ) for i in reversed(range(0, bits))])
@@ -8,7 +9,8 @@ def int_to_binary(n: int, bits: int = 8):
 def bytes_to_binary(data: Union[bytearray,bytes]):
     return ','.join([int_to_binary(byte) for byte in data])
 
-def main(debug: bool, chip_select: int, channel: int):
+def main(debug: bool, chip_select: int, channel: int, probe: str = None):
+    table = load_table(probe)  # 値 -> 温度の変換テーブル (プローブのキャリブレーション)
     pi = pigpio.pi()
     if not pi.connected:
         raise Exception("pigpio connection faild...")
@@ -43,7 +45,7 @@ def main(debug: bool, chip_select: int, channel: int):
                 continue
             value = int.from_bytes(read_data, "big") & 0b1111111111  # 10ビットを値として取り出す
             volt = (value / 1023.0) * VREF  # 温度センサーから入力された電圧
-            temp = (volt - 0.6) / 0.01  # 電圧を温度に変換。(0℃で600mV , 1℃につき10mV増減)
+            temp = table[value]  # 温度に変換 (公称の式なら 0℃で600mV , 1℃につき10mV増減)
 
             if (debug):
                 print(f"w: {bytes_to_binary(write_data)}")
@@ -0,0 +1,236 @@
+# pigpiod の中でMCP3002を一定間隔でサンプリングする (pigpioのスクリプト)
+#
+# temp_pigpio.py のように Python で1サンプルごとに spi_xfer を呼ぶと、
+# サンプリングの間隔は pigpiod とのソケット通信やPythonのスケジューリング (GIL, time.sleep) でぶれる。
+# ここではサンプリングのループを store_script で pigpiod に登録して run_script で実行し、
+# 間隔の管理と変換をデーモンの中で行う。Pythonは終わったバッチの結果を script_status でまとめて受け取るだけ。
+#
+# スクリプトから Python へ値を返せるのはパラメーター p0 ~ p9 (各32bit) だけなので、
+#   p0 ~ p6: 10bitの値を3個ずつ詰める (1バッチ = 21サンプル。先に変換した値が上位ビット)
+#   p7     : 予定時刻からの遅れ[us]の合計
+#   p8     : 1サンプル目の予定時刻から最後の変換が終わるまでの時間[us]
+#   p9     : 予定時刻からの遅れ[us]の最大値
+# として返し、バッチが終わる (HALTED) たびに Python から run_script で次のバッチを開始する。
+#
+# 実行方法
+#   ./bin/cli temp-pigpio-script --chip-select 0 --channel 0 --interval 1000 --batches 50
+import time
+from typing import List, NamedTuple
+import pigpio
+from temp_sensor.calibration import load_table
+
+PACKED_PARAMS = 7
+SAMPLES_PER_PARAM = 3
+BATCH_SIZE = PACKED_PARAMS * SAMPLES_PER_PARAM
+
+# 変数
+#   v0: SPIのハンドル, v1: サンプリング間隔[us], v3: 次のサンプルの予定時刻 (tick)
+#   v4: 開始時刻, v5: 遅れの合計, v6: 待ち時間/遅れ, v7: 変換した値, v9: 遅れの最大値, v10: 値を詰める作業用
+# tag 10: 予定時刻まで待ってから1回変換し、v10 に値を詰める
+#   spix の受信データはスクリプトのバッファに入るので ldab で取り出す (受信した2バイトの下位10bitが値)
+SCRIPT = """
+ld v0 p0
+ld v1 p1
+ld v5 0
+ld v9 0
+tick
+sta v3
+sta v4
+{body}
+tick
+sub v4
+sta p8
+lda v5
+sta p7
+lda v9
+sta p9
+halt
+tag 10
+tick
+sta v6
+lda v3
+sub v6
+jm 11
+jz 11
+sta v6
+mics v6
+tag 11
+tick
+sub v3
+sta v6
+add v5
+sta v5
+lda v6
+cmp v9
+jm 12
+jz 12
+lda v6
+sta v9
+tag 12
+spix v0 {command} 0
+ldab 0
+and 3
+rla 8
+sta v7
+ldab 1
+or v7
+sta v7
+lda v10
+rla 10
+or v7
+sta v10
+lda v3
+add v1
+sta v3
+ret
+"""
+
+PARAM_BODY = """
+ld v10 0
+call 10
+call 10
+call 10
+lda v10
+sta p{index}
+"""
+
+
+def command(channel: int) -> int:
+    """MCP3002に送る1バイト目 (スタートビット, シングルエンドモード, チャンネル, MSBFのみ)"""
+    return 0b01101000 | (0b1 * channel) << 4
+
+
+def build_script(channel: int) -> bytes:
+    body = "".join(PARAM_BODY.format(index=i) for i in range(PACKED_PARAMS))
+    text = SCRIPT.format(body=body, command=command(channel))
+    return " ".join(text.split()).encode()
+
+
+def unpack(params) -> List[int]:
+    """p0 ~ p6 に詰めた値を変換した順に取り出す"""
+    values = []
+    for param in params[:PACKED_PARAMS]:
+        for shift in (20, 10, 0):
+            values.append((param >> shift) & 0b1111111111)
+    return values
+
+
+class Batch(NamedTuple):
+    values: List[int]
+    elapsed_us: int    # 1サンプル目の予定時刻から最後の変換が終わるまでの時間
+    late_sum_us: int   # 予定時刻からの遅れの合計
+    late_max_us: int   # 予定時刻からの遅れの最大値
+
+
+class ScriptSampler:
+    """pigpiod のスクリプトで BATCH_SIZE 回ずつ変換する"""
+
+    def __init__(self, pi, spi_handler, channel: int, interval_us: int):
+        self.pi = pi
+        self.spi_handler = spi_handler
+        self.interval_us = interval_us
+        self.sid = pi.store_script(build_script(channel))
+        if self.sid < 0:
+            raise Exception(f"store_script faild... ({self.sid})")
+        # 登録直後は初期化中 (PI_SCRIPT_INITING) なので実行できるようになるまで待つ
+        while pi.script_status(self.sid)[0] == pigpio.PI_SCRIPT_INITING:
+            time.sleep(0.001)
+
+    def start(self):
+        status = self.pi.run_script(self.sid, [self.spi_handler, self.interval_us])
+        if status < 0:
+            raise Exception(f"run_script faild... ({status})")
+
+    def wait(self) -> Batch:
+        """バッチが終わるまで待って結果を受け取る"""
+        # 最後のサンプルの少し前まで寝てから状態を確認する
+        time.sleep(max(0.0, (BATCH_SIZE - 1) * self.interval_us / 1e6 - 0.001))
+        while True:
+            status, params = self.pi.script_status(self.sid)
+            if status == pigpio.PI_SCRIPT_HALTED:
+                return Batch(unpack(params), params[8], params[7], params[9])
+            if status not in (pigpio.PI_SCRIPT_RUNNING, pigpio.PI_SCRIPT_WAITING):
+                raise Exception(f"script faild... (status={status})")
+            time.sleep(0.0002)
+
+    def read(self) -> Batch:
+        self.start()
+        return self.wait()
+
+    def close(self):
+        self.pi.stop_script(self.sid)
+        self.pi.delete_script(self.sid)
+
+
+def python_loop(pi, spi_handler, channel: int, interval_us: int, n: int) -> Batch:
+    """比較用: temp_pigpio.py と同じく Python で1サンプルずつ spi_xfer する"""
+    write_data = bytes([command(channel), 0])
+    interval = interval_us / 1e6
+    values = []
+    late_sum = late_max = 0.0
+    start = due = time.perf_counter()
+    for _ in range(n):
+        wait = due - time.perf_counter()
+        if wait > 0:
+            time.sleep(wait)
+        late = time.perf_counter() - due
+        late_sum += late
+        late_max = max(late_max, late)
+        _, read_data = pi.spi_xfer(spi_handler, write_data)
+        values.append(int.from_bytes(read_data, "big") & 0b1111111111)
+        due += interval
+    elapsed = time.perf_counter() - start
+    return Batch(values, round(elapsed * 1e6), round(late_sum * 1e6), round(late_max * 1e6))
+
+
+def report(name: str, n: int, sampled_us: int, wall: float, late_sum_us: int, late_max_us: int):
+    """rate(in batch) はサンプリング中の時間だけ、rate(overall) はバッチの受け渡しも含めた時間で計算する"""
+    print(f"{name:<8}: samples={n}, rate(in batch)={n / sampled_us * 1e6:.1f} samples/sec, "
+          f"rate(overall)={n / wall:.1f} samples/sec, "
+          f"lateness mean={late_sum_us / n:.1f}us max={late_max_us}us")
+
+
+def main(debug: bool, chip_select: int, channel: int, interval_us: int = 1000, batches: int = 50, probe: str = None):
+    table = load_table(probe)
+    pi = pigpio.pi()
+    if not pi.connected:
+        raise Exception("pigpio connection faild...")
+
+    SPI_MODE = 0b00  # SPIモード0 (temp_pigpio.py と同じ)
+    CLOCK_SPEED = 50000  # 50KHz
+    h = pi.spi_open(chip_select, CLOCK_SPEED, SPI_MODE)
+    sampler = None
+    try:
+        sampler = ScriptSampler(pi, h, channel, interval_us)
+        values = []
+        sampled_us = late_sum = late_max = 0
+        start = time.perf_counter()
+        for _ in range(batches):
+            batch = sampler.read()
+            values.extend(batch.values)
+            sampled_us += batch.elapsed_us
+            late_sum += batch.late_sum_us
+            late_max = max(late_max, batch.late_max_us)
+            if debug:
+                print(f"values: {batch.values}, elapsed: {batch.elapsed_us}us, late(max): {batch.late_max_us}us")
+        wall = time.perf_counter() - start
+        n = len(values)
+        print(f"Temp: {sum(table.convert_many(values)) / n} (mean of {n} samples, interval={interval_us}us)")
+        report("script", n, sampled_us, wall, late_sum, late_max)
+
+        start = time.perf_counter()
+        batch = python_loop(pi, h, channel, interval_us, n)
+        wall = time.perf_counter() - start
+        report("python", n, batch.elapsed_us, wall, batch.late_sum_us, batch.late_max_us)
+    finally:
+        if sampler is not None:
+            sampler.close()
+        pi.spi_close(h)
+        pi.stop()
+        print("[info] spi closed.")
+
+
+if __name__ == "__main__":
+    CHIP_SELECT = 0  # ラズパイの CE0端子, CE1端子どちらに接続するか
+    CHANNEL = 0  # MCP3002のCH0端子,CH1端子どちらを利用するか
+    main(True, CHIP_SELECT, CHANNEL)
@@ -0,0 +1,210 @@
+# /dev/spidev0.N を直接操作してMCP3002から温度を読み込む
+#
+# temp_pigpio.py は1回の変換ごとに pigpiod へのソケット通信 (spi_xfer) を、
+# temp_wiringpi.py は1回の変換ごとに wiringPiSPIDataRW を呼び出している。
+# ここでは SPI_IOC_MESSAGE(n) の ioctl で n 回分の変換 (2バイトの転送 x n) をまとめてカーネルに渡すので、
+# 数百サンプルのバーストでもシステムコールは1回で済む。
+#   - 転送の間は cs_change=1 でCSを一度HIGHに戻す (MCP3002はCSの立ち下がりで変換を開始するため)
+#   - spidev のバッファサイズ (既定4096バイト) と ioctl のサイズ (14bit) の制限があるので、1回の ioctl は MAX_BURST 回まで
+#
+# 実機がなくても FakeSpiDev (MCP3002, MCP3004/MCP3008の応答を真似する) で動作を確認できる
+#   ./bin/cli --debug temp-spidev --fake
+import ctypes
+import fcntl
+import os
+import time
+from typing import List, Union
+from temp_sensor.calibration import load_table
+
+# linux/spi/spidev.h
+SPI_IOC_MAGIC = ord("k")
+_IOC_WRITE = 1
+
+
+def _iow(nr: int, size: int) -> int:
+    return (_IOC_WRITE << 30) | (size << 16) | (SPI_IOC_MAGIC << 8) | nr
+
+
+SPI_IOC_WR_MODE = _iow(1, 1)
+SPI_IOC_WR_BITS_PER_WORD = _iow(3, 1)
+SPI_IOC_WR_MAX_SPEED_HZ = _iow(4, 4)
+
+
+class SpiIocTransfer(ctypes.Structure):
+    """struct spi_ioc_transfer (32バイト)"""
+    _fields_ = [
+        ("tx_buf", ctypes.c_uint64),
+        ("rx_buf", ctypes.c_uint64),
+        ("len", ctypes.c_uint32),
+        ("speed_hz", ctypes.c_uint32),
+        ("delay_usecs", ctypes.c_uint16),
+        ("bits_per_word", ctypes.c_uint8),
+        ("cs_change", ctypes.c_uint8),
+        ("tx_nbits", ctypes.c_uint8),
+        ("rx_nbits", ctypes.c_uint8),
+        ("word_delay_usecs", ctypes.c_uint8),
+        ("pad", ctypes.c_uint8),
+    ]
+
+
+def SPI_IOC_MESSAGE(n: int) -> int:
+    return _iow(0, ctypes.sizeof(SpiIocTransfer) * n)
+
+
+FRAME_SIZE = 2  # MCP3002の1回の変換の転送バイト数
+MAX_BURST = 256  # 1回の ioctl でまとめる変換の回数 (256 x 2バイト = 512バイト)
+
+
+class SpiDev:
+    """/dev/spidev<bus>.<device> を直接操作する"""
+
+    def __init__(self, bus: int = 0, device: int = 0, speed: int = 50000, mode: int = 0b00, delay_usecs: int = 0):
+        """delay_usecs: 転送ごとに、転送が終わってからCSをHIGHに戻すまでの待ち時間[us]"""
+        if not 0 <= delay_usecs <= 0xFFFF:  # spi_ioc_transfer.delay_usecs は u16
+            raise ValueError(f"invalid delay_usecs: {delay_usecs} (0 - 65535)")
+        self.speed = speed
+        self.delay_usecs = delay_usecs
+        self.fd = os.open(f"/dev/spidev{bus}.{device}", os.O_RDWR)
+        try:
+            fcntl.ioctl(self.fd, SPI_IOC_WR_MODE, ctypes.c_uint8(mode))
+            fcntl.ioctl(self.fd, SPI_IOC_WR_BITS_PER_WORD, ctypes.c_uint8(8))
+            fcntl.ioctl(self.fd, SPI_IOC_WR_MAX_SPEED_HZ, ctypes.c_uint32(speed))
+        except OSError:
+            os.close(self.fd)
+            raise
+        # 同じ回数の転送を繰り返すので、転送の設定とバッファは回数ごとに作っておいて使い回す
+        self._messages = {}
+        self.ioctl_count = 0
+
+    def _message(self, n: int, frame_size: int):
+        key = (n, frame_size)
+        if key not in self._messages:
+            tx = ctypes.create_string_buffer(frame_size * n)
+            rx = ctypes.create_string_buffer(frame_size * n)
+            transfers = (SpiIocTransfer * n)()
+            for i, t in enumerate(transfers):
+                t.tx_buf = ctypes.addressof(tx) + frame_size * i
+                t.rx_buf = ctypes.addressof(rx) + frame_size * i
+                t.len = frame_size
+                t.speed_hz = self.speed
+                t.bits_per_word = 8
+                t.delay_usecs = self.delay_usecs
+                # 最後の転送以外はCSを一度HIGHに戻す (最後の転送で1にするとCSがLOWのまま残る)
+                t.cs_change = 1 if i < n - 1 else 0
+            self._messages[key] = (tx, rx, transfers)
+        return self._messages[key]
+
+    def transfer(self, tx_data: bytes, frame_size: int = FRAME_SIZE) -> bytes:
+        """tx_data を frame_size ごとの転送に分けて1回の ioctl で送受信する"""
+        n = len(tx_data) // frame_size
+        tx, rx, transfers = self._message(n, frame_size)
+        ctypes.memmove(tx, tx_data, len(tx_data))
+        fcntl.ioctl(self.fd, SPI_IOC_MESSAGE(n), transfers)
+        self.ioctl_count += 1
+        return rx.raw
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FakeSpiDev:
+    """
+    MCP3002 (2バイトの転送) / MCP3004, MCP3008 (3バイトの転送) の代わり (実機なしで動作確認するため)
+
+    コマンドのスタートビット・チャンネルを解釈して、
+    チャンネルごとに決めた電圧 (+ 1LSBの揺らぎ) の10bitの値を返す
+    """
+
+    def __init__(self, volts=(0.85, 1.1, 0.6, 0.75, 0.9, 1.05, 1.2, 1.35), vref: float = 3.3):
+        self.codes = [round(v / vref * 1023) for v in volts]
+        self.count = 0
+        self.ioctl_count = 0
+
+    def transfer(self, tx_data: bytes, frame_size: int = FRAME_SIZE) -> bytes:
+        rx = bytearray(len(tx_data))
+        for i in range(0, len(tx_data), frame_size):
+            command = int.from_bytes(tx_data[i:i + frame_size], "big")
+            if frame_size == 2:
+                # MCP3002: 0 1(start) SGL ODD MSBF ...
+                if not command & (0b1 << 14):  # スタートビットがなければ何も返さない
+                    continue
+                channel = (command >> 12) & 0b1
+            else:
+                # MCP3004/MCP3008: 0000000 1(start) | SGL D2 D1 D0 ...
+                if not command & (0b1 << 16):
+                    continue
+                channel = (command >> 12) & 0b111
+            value = min(1023, self.codes[channel] + self.count % 2)
+            self.count += 1
+            rx[i:i + frame_size] = value.to_bytes(frame_size, "big")  # 値より上のビットは不定 (ここでは0)
+        self.ioctl_count += 1
+        return bytes(rx)
+
+    def close(self):
+        pass
+
+
+def int_to_binary(n: int, bits: int = 8):
+    return ''.join([str(n >> i & 1 ) for i in reversed(range(0, bits))])
+
+
+def bytes_to_binary(data: Union[bytearray,bytes]):
+    return ','.join([int_to_binary(byte) for byte in data])
+
+
+def command(channel: int) -> bytes:
+    """MCP3002に送る2バイト (スタートビット, シングルエンドモード, チャンネル, MSBFのみ)"""
+    write_data = 0b0110100000000000
+    write_data = write_data | (0b1 * channel) << 12
+    return write_data.to_bytes(FRAME_SIZE, "big")
+
+
+def read_burst(dev: Union[SpiDev, FakeSpiDev], channel: int, n: int) -> List[int]:
+    """channel を n 回変換して10bitの値のリストを返す (MAX_BURST 回ごとに1回の ioctl)"""
+    values = []
+    frame = command(channel)
+    for start in range(0, n, MAX_BURST):
+        count = min(MAX_BURST, n - start)
+        rx = dev.transfer(frame * count, FRAME_SIZE)
+        values.extend(
+            int.from_bytes(rx[i:i + FRAME_SIZE], "big") & 0b1111111111  # 10ビットを値として取り出す
+            for i in range(0, len(rx), FRAME_SIZE)
+        )
+    return values
+
+
+def main(debug: bool, chip_select: int, channel: int, burst: int = 100, fake: bool = False, probe: str = None):
+    """
+    1秒ごとに burst 回変換して平均の温度を表示する
+    fake=True の場合は /dev/spidev の代わりに FakeSpiDev を使う
+    """
+    table = load_table(probe)
+    CLOCK_SPEED = 50000  # 50KHz
+    dev = FakeSpiDev() if fake else SpiDev(0, chip_select, CLOCK_SPEED, 0b00)
+    try:
+        while True:
+            ioctl_count = dev.ioctl_count
+            start = time.perf_counter()
+            values = read_burst(dev, channel, burst)
+            elapsed = time.perf_counter() - start
+            value = sum(values) / len(values)
+            temp = sum(table.convert_many(values)) / len(values)
+
+            if (debug):
+                print(f"w: {bytes_to_binary(command(channel))}")
+                print(f"values: {values[:8]}{' ...' if len(values) > 8 else ''}")
+                print(f"value(mean): {value}, temp: {temp}, "
+                      f"samples: {len(values)}, ioctl: {dev.ioctl_count - ioctl_count}, "
+                      f"elapsed: {elapsed * 1000:.2f}ms ({len(values) / elapsed:.0f} samples/sec)")
+            else:
+                print(f"Temp: {temp}")
+            time.sleep(1)
+    finally:
+        dev.close()
+        print("[info] spi closed.")
+
+
+if __name__ == "__main__":
+    CHIP_SELECT = 0  # ラズパイの CE0端子, CE1端子どちらに接続するか
+    CHANNEL = 0  # MCP3002のCH0端子,CH1端子どちらを利用するか
+    main(True, CHIP_SELECT, CHANNEL)
@@ -1,6 +1,7 @@
 import wiringpi as pi
 import time
 from typing import Union
+from temp_sensor.calibration import load_table
 
 def int_to_binary(n: int, bits: int = 8):
     return ''.join([str(n >> i & 1 ) for i in reversed(range(0, bits))])
@@ -8,7 +9,8 @@ def int_to_binary(n: int, bits: int = 8):
 def bytes_to_binary(data: Union[bytearray,bytes]):
     return ','.join([int_to_binary(byte) for byte in data])
 
-def main(debug: bool, chip_select: int, channel: int):
+def main(debug: bool, chip_select: int, channel: int, probe: str = None):
+    table = load_table(probe)  # 値 -> 温度の変換テーブル (プローブのキャリブレーション)
     SPI_SPEED = 50000  # 50KHz
     VREF = 3.3  # A/Dコンバータの基準電圧
 
@@ -24,7 +26,7 @@ def main(debug: bool, chip_select: int, channel: int):
         pi.wiringPiSPIDataRW(chip_select , buffer)  # データの送信と同時にbufferにデータを受信する
         value = int.from_bytes(buffer, "big") & 0b1111111111  # 10ビットを値として取り出す
         volt = VREF * (value / 1023.0)
-        temp = (volt - 0.6) / 0.01
+        temp = table[value]
         if (debug):
             print(f"w: {bytes_to_binary(write_data.to_bytes(2, 'big'))}")
             print(f"r: {bytes_to_binary(buffer)}")